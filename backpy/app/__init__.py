@@ -1,81 +1,186 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, current_app, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
 import os
+import weakref
 from datetime import datetime
 from functools import wraps
 import jwt
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app.config import get_config, engine_options, apply_sqlite_pragmas
+from app.services.auth_cache import Principal, principal_cache
+from app.services.breach import breach_index
+from app.services.encoding import FastJSONProvider, orjson
+from app.services.hashing import hashing_pool
+from app.services.keyring import configure_keyring
+from app.services.metrics import metrics
+from app.services.rate_limit import backend_from_url, limiter
+from app.services.strength import strength_estimator
+from app.services.wordlist import wordlist
 
 # Initialize extensions
 db = SQLAlchemy()
 login_manager = LoginManager()
 
+# Engines dos apps criados neste processo. Servidores com pre-fork: cada worker
+# descarta as conexões herdadas e abre as próprias (um único handler por processo)
+_engines = weakref.WeakSet()
+
+def _dispose_engines():
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines)
+
 # Helper para autenticação via token JWT
+def _bearer_token():
+    # Obter o token do cabeçalho Authorization
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+def _authenticate(token):
+    """(Principal, None) para um token válido; (None, mensagem) caso contrário"""
+    # Tokens já verificados dispensam a decodificação e a consulta ao banco
+    current_user = principal_cache.get(token)
+    if current_user is not None:
+        return current_user, None
+    
+    try:
+        # Decodificar o token
+        with metrics.timer('hot_path_duration_seconds', operation='jwt_decode'):
+            data = jwt.decode(
+                token, 
+                current_app.config['SECRET_KEY'],
+                algorithms=["HS256"]
+            )
+        
+        # Obter o usuário a partir do token
+        from app.models.user import User
+        user = db.session.get(User, data['user_id'])
+        
+        if not user:
+            return None, 'Usuário não encontrado'
+            
+    except jwt.ExpiredSignatureError:
+        return None, 'Token expirado. Faça login novamente'
+    except jwt.InvalidTokenError:
+        return None, 'Token inválido'
+    
+    current_user = Principal.from_user(user)
+    current_user.remember(user)
+    principal_cache.put(token, current_user, data.get('exp'))
+    return current_user, None
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        from flask import request
-        token = None
-        
-        # Obter o token do cabeçalho Authorization
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
+        token = _bearer_token()
         if not token:
             return jsonify({'message': 'Token de autenticação não fornecido'}), 401
         
-        try:
-            # Decodificar o token
-            data = jwt.decode(
-                token, 
-                os.environ.get('SECRET_KEY', 'dev-secret-key'),
-                algorithms=["HS256"]
-            )
-            
-            # Obter o usuário a partir do token
-            from app.models.user import User
-            current_user = User.query.get(data['user_id'])
-            
-            if not current_user:
-                return jsonify({'message': 'Usuário não encontrado'}), 401
-                
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token expirado. Faça login novamente'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token inválido'}), 401
+        current_user, error = _authenticate(token)
+        if error:
+            return jsonify({'message': error}), 401
         
         return f(current_user, *args, **kwargs)
     
     return decorated
 
-def create_app():
+def optional_principal():
+    """Usuário do token, se houver um válido; rotas anônimas seguem sem ele"""
+    token = _bearer_token()
+    if not token:
+        return None
+    return _authenticate(token)[0]
+
+def create_app(config_name=None):
     app = Flask(__name__)
+    if orjson is not None:
+        # Serialização JSON pelo orjson quando instalado
+        app.json = FastJSONProvider(app)
     
     # Enable CORS
     CORS(app, resources={r"/*": {"origins": "*"}})
     
     # Configure the app
-    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URI', 'sqlite:///app.db')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    config = get_config(config_name)
+    app.config.from_object(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config['PROXY_FIX_X_FOR']:
+        # remote_addr (usado pelos limites por IP) passa a ser o cliente informado pelo proxy
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
     
     # Initialize extensions with the app
     db.init_app(app)
     login_manager.init_app(app)
+    with app.app_context():
+        _engines.add(db.engine)
+        if app.config['SQLITE_PRAGMAS'] and db.engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+    # Mesmo SECRET_KEY do JWT; o PBKDF2 das chaves roda aqui, uma vez por processo
+    configure_keyring(app.config['SECRET_KEY'], app.config['RETIRED_SECRET_KEYS'])
+    principal_cache.configure(app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL'])
+    limiter.configure(
+        app.config['RATE_LIMIT_ENABLED'],
+        app.config['RATE_LIMITS'],
+        backend_from_url(app.config['RATE_LIMIT_BACKEND'], app.config['RATE_LIMIT_SHARDS'],
+                         app.config['RATE_LIMIT_MAX_KEYS'])
+    )
+    hashing_pool.configure(
+        app.config['HASH_WORKERS'],
+        app.config['HASH_MAX_PENDING'],
+        app.config['HASH_METHOD'],
+        app.config['HASH_TIMEOUT']
+    )
+    try:
+        breach_index.configure(app.config['BREACH_INDEX_PATH'])
+    except (OSError, ValueError) as e:
+        # Sem índice a API continua no ar; o comando de geração também usa o app
+        app.logger.warning("Índice de vazamentos indisponível: %s", e)
+    # Autômato dos dicionários montado uma vez e compartilhado por todas as requisições
+    strength_estimator.configure(app.config['STRENGTH_WORDLIST_PATH'])
+    wordlist.configure(app.config['PASSPHRASE_WORDLIST_PATH'])
+    
+    # Fila do histórico: a thread de gravação só nasce no primeiro evento
+    from app.services.history import history_writer
+    history_writer.configure(
+        app,
+        app.config['HISTORY_ENABLED'],
+        app.config['HISTORY_BATCH_SIZE'],
+        app.config['HISTORY_FLUSH_INTERVAL'],
+        app.config['HISTORY_MAX_QUEUE'],
+        app.config['HISTORY_RETENTION_DAYS'],
+        app.config['HISTORY_PRUNE_INTERVAL']
+    )
     
     # Register blueprints
     from app.routes.auth import auth_bp
+    from app.routes.history import history_bp
     from app.routes.password import password_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(password_bp)
+    app.register_blueprint(history_bp)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Instrumentação só é ligada quando habilitada; desligada, os timers são no-op
+    metrics.configure(app.config['METRICS_ENABLED'])
+    if app.config['METRICS_ENABLED']:
+        from app.routes.metrics import metrics_bp, register_collectors
+        from app.services.metrics import instrument_app
+        
+        app.register_blueprint(metrics_bp)
+        register_collectors()
+        with app.app_context():
+            instrument_app(app, db.engine)
+
+    # Register CLI commands (o schema é criado com `flask init-db`, não no boot)
+    from app.commands import register_commands
+    register_commands(app)
     
     # Rota padrão para verificar se a API está funcionando
     @app.route('/')
@@ -86,4 +191,5 @@ def create_app():
             'version': '1.0.0'
         })
     
-    return app 
\ No newline at end of file
+    return app
+
@@ -0,0 +1,99 @@
+import click
+
+from app import db
+from app.services.breach import build_breach_index
+from app.services.history import prune_history
+from app.services.keyring import reencrypt_saved_passwords, keyring_stats
+from app.services.migration import backfill_name_index, migrate_plaintext_passwords, upgrade_schema
+from app.services.wordlist import pack_wordlist
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    @click.option('--drop', is_flag=True, help='Apaga as tabelas existentes antes de criar')
+    def init_db(drop):
+        """Cria as tabelas do banco de dados"""
+        if drop:
+            db.drop_all()
+        db.create_all()
+        click.echo("Tabelas criadas com sucesso")
+
+    @app.cli.command('upgrade-db')
+    @click.option('--chunk-size', default=500, show_default=True,
+                  help='Quantidade de senhas numeradas por transação')
+    def upgrade_db(chunk_size):
+        """Atualiza um banco antigo para o schema atual sem apagar dados"""
+        result = upgrade_schema(chunk_size, logger=app.logger)
+        click.echo(f"Colunas adicionadas: {', '.join(result['columns']) or 'nenhuma'}")
+        click.echo(f"Senhas numeradas: {result['numbered']}, versões corrigidas: {result['versions']}")
+        click.echo(f"Nomes indexados: {result['names']}")
+
+    @app.cli.command('rotate-keys')
+    @click.option('--chunk-size', default=500, show_default=True,
+                  help='Quantidade de senhas recifradas por transação')
+    @click.option('--restart', is_flag=True,
+                  help='Ignora o checkpoint da chave atual e varre a tabela desde o início')
+    def rotate_keys(chunk_size, restart):
+        """Recifra as senhas salvas com a SECRET_KEY atual"""
+        result = reencrypt_saved_passwords(chunk_size, restart, logger=app.logger)
+        click.echo(f"Senhas recifradas: {result['rotated']}")
+        if result['skipped']:
+            click.echo(f"Senhas ignoradas (chave desconhecida ou texto simples): {result['skipped']}")
+        click.echo(f"Checkpoint: id {result['last_id']}")
+        stats = keyring_stats()
+        click.echo(f"Derivações de chave: {stats['key_derivations']}, acertos de cache: {stats['cache_hits']}")
+
+    @app.cli.command('migrate-plaintext')
+    @click.option('--chunk-size', default=500, show_default=True,
+                  help='Quantidade de senhas cifradas por transação')
+    @click.option('--restart', is_flag=True,
+                  help='Ignora o checkpoint e varre a tabela desde o início')
+    def migrate_plaintext(chunk_size, restart):
+        """Cifra as senhas salvas que ainda estão em texto simples"""
+        result = migrate_plaintext_passwords(chunk_size, restart, logger=app.logger)
+        click.echo(f"Senhas verificadas: {result['scanned']}, cifradas: {result['migrated']}")
+        click.echo(f"Checkpoint: id {result['last_id']}")
+
+    @app.cli.command('index-names')
+    @click.option('--chunk-size', default=500, show_default=True,
+                  help='Quantidade de nomes preenchidos por transação')
+    def index_names(chunk_size):
+        """Cria e preenche a coluna de busca por nome em bancos antigos"""
+        result = backfill_name_index(chunk_size, logger=app.logger)
+        click.echo(f"Nomes indexados: {result['updated']}")
+
+    @app.cli.command('prune-history')
+    @click.option('--days', type=int, default=None,
+                  help='Retenção em dias (padrão: HISTORY_RETENTION_DAYS)')
+    def prune_history_command(days):
+        """Apaga do histórico de gerações os eventos mais antigos que a retenção"""
+        days = app.config['HISTORY_RETENTION_DAYS'] if days is None else days
+        if days <= 0:
+            click.echo("Retenção desativada (HISTORY_RETENTION_DAYS <= 0)")
+            return
+        removed = prune_history(days)
+        click.echo(f"Eventos removidos: {removed}")
+
+    @app.cli.command('build-breach-index')
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.argument('output', type=click.Path(dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['hibp', 'plaintext']), default='hibp',
+                  show_default=True, help='hibp: linhas SHA1:contagem; plaintext: uma senha por linha')
+    @click.option('--fp-rate', default=0.01, show_default=True,
+                  help='Taxa de falsos positivos do filtro de Bloom')
+    @click.option('--chunk-size', default=2_000_000, show_default=True,
+                  help='Hashes ordenados em memória por bloco')
+    def build_breach_index_command(source, output, fmt, fp_rate, chunk_size):
+        """Gera o índice offline de senhas vazadas a partir de um dump local"""
+        result = build_breach_index(source, output, fmt, fp_rate, chunk_size, logger=app.logger)
+        click.echo(f"Hashes indexados: {result['entries']}")
+        click.echo(f"Filtro de Bloom: {result['bloom_bytes']} bytes, {result['bloom_hashes']} hashes")
+        click.echo(f"Arquivo: {output} ({result['size']} bytes)")
+
+    @app.cli.command('pack-wordlist')
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.argument('output', type=click.Path(dir_okay=False))
+    def pack_wordlist_command(source, output):
+        """Converte uma lista de palavras em texto para o formato compacto do modo frase secreta"""
+        result = pack_wordlist(source, output)
+        click.echo(f"Palavras: {result['words']} ({result['size']} bytes)")
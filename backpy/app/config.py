@@ -0,0 +1,174 @@
+import os
+
+from sqlalchemy import event
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() == 'true'
+
+
+class Config:
+    """Configuração base; o ambiente é lido ao instanciar o perfil escolhido, não na importação"""
+
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    def __init__(self):
+        self.SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
+        # Segredos anteriores, separados por vírgula: só decifram, até o `rotate-keys` terminar
+        self.RETIRED_SECRET_KEYS = tuple(
+            s.strip() for s in os.environ.get('RETIRED_SECRET_KEYS', '').split(',') if s.strip()
+        )
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite:///app.db')
+        self.SQLALCHEMY_ENGINE_OPTIONS = {}
+
+        # PRAGMAs aplicados em cada conexão SQLite nova (vazio = padrão do SQLite)
+        self.SQLITE_PRAGMAS = {}
+
+        # Pool de conexões para bancos servidor (PostgreSQL, MySQL...)
+        self.DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+        self.DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+        self.DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)
+        self.DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+
+        self.BATCH_MAX_COUNT = _env_int('BATCH_MAX_COUNT', 10000)
+        self.BATCH_MAX_LENGTH = _env_int('BATCH_MAX_LENGTH', 128)
+        self.BATCH_STREAM_THRESHOLD = _env_int('BATCH_STREAM_THRESHOLD', 1000)
+        self.PAGE_MAX_LIMIT = _env_int('PAGE_MAX_LIMIT', 500)
+        # Operações aceitas por chamada de POST /api/passwords/batch
+        self.MUTATION_BATCH_MAX = _env_int('MUTATION_BATCH_MAX', 1000)
+        self.AUTH_CACHE_SIZE = _env_int('AUTH_CACHE_SIZE', 1024)
+        self.AUTH_CACHE_TTL = _env_int('AUTH_CACHE_TTL', 60)
+        self.HASH_METHOD = os.environ.get('HASH_METHOD', 'scrypt:32768:8:1')
+        self.HASH_WORKERS = _env_int('HASH_WORKERS', 2)
+        self.HASH_MAX_PENDING = _env_int('HASH_MAX_PENDING', 32)
+        self.HASH_TIMEOUT = _env_int('HASH_TIMEOUT', 30)
+
+        # Histórico de gerações: fila write-behind gravada em lotes (por tamanho ou a
+        # cada HISTORY_FLUSH_INTERVAL segundos) e poda dos eventos após a retenção
+        self.HISTORY_ENABLED = _env_bool('HISTORY_ENABLED', True)
+        self.HISTORY_BATCH_SIZE = _env_int('HISTORY_BATCH_SIZE', 100)
+        self.HISTORY_FLUSH_INTERVAL = _env_int('HISTORY_FLUSH_INTERVAL', 1)
+        self.HISTORY_MAX_QUEUE = _env_int('HISTORY_MAX_QUEUE', 10000)
+        self.HISTORY_RETENTION_DAYS = _env_int('HISTORY_RETENTION_DAYS', 90)
+        self.HISTORY_PRUNE_INTERVAL = _env_int('HISTORY_PRUNE_INTERVAL', 3600)
+
+        # Rate limit por baldes de fichas ("N/second|minute|hour|day"; vazio desliga a regra).
+        # `memory://` guarda os baldes no processo; `redis://...` compartilha entre servidores
+        self.RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', True)
+        self.RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory://')
+        self.RATE_LIMIT_MAX_KEYS = _env_int('RATE_LIMIT_MAX_KEYS', 100000)
+        self.RATE_LIMIT_SHARDS = _env_int('RATE_LIMIT_SHARDS', 16)
+        # Proxies reversos confiáveis à frente do app: com N > 0 o IP dos limites vem
+        # do N-ésimo endereço do X-Forwarded-For, contado da direita (0 = remote_addr)
+        self.PROXY_FIX_X_FOR = _env_int('PROXY_FIX_X_FOR', 0)
+        self.RATE_LIMITS = {
+            'login': os.environ.get('RATE_LIMIT_LOGIN', '10/minute'),
+            'register': os.environ.get('RATE_LIMIT_REGISTER', '5/minute'),
+            'generate': os.environ.get('RATE_LIMIT_GENERATE', '120/minute'),
+            'generate_batch': os.environ.get('RATE_LIMIT_GENERATE_BATCH', '20/minute'),
+            'strength': os.environ.get('RATE_LIMIT_STRENGTH', '60/minute'),
+            'vault_read': os.environ.get('RATE_LIMIT_VAULT_READ', '60/minute'),
+            'vault_write': os.environ.get('RATE_LIMIT_VAULT_WRITE', '60/minute'),
+        }
+        self.METRICS_ENABLED = _env_bool('METRICS_ENABLED', False)
+
+        # Compressão negociada (gzip/zstd) a partir deste tamanho de corpo, em bytes
+        self.COMPRESSION_MIN_SIZE = _env_int('COMPRESSION_MIN_SIZE', 1024)
+        self.GZIP_LEVEL = _env_int('GZIP_LEVEL', 6)
+        self.ZSTD_LEVEL = _env_int('ZSTD_LEVEL', 3)
+
+        # Índice offline de senhas vazadas (gerado com `flask build-breach-index`)
+        self.BREACH_INDEX_PATH = os.environ.get('BREACH_INDEX_PATH')
+        self.BREACH_MAX_RETRIES = _env_int('BREACH_MAX_RETRIES', 5)
+
+        # Lista compacta do modo frase secreta (gerada com `flask pack-wordlist`)
+        self.PASSPHRASE_WORDLIST_PATH = os.environ.get('PASSPHRASE_WORDLIST_PATH')
+        self.PASSPHRASE_MAX_WORDS = _env_int('PASSPHRASE_MAX_WORDS', 20)
+
+        # Dicionário extra para a análise de força (uma palavra por linha, mais comuns primeiro)
+        self.STRENGTH_WORDLIST_PATH = os.environ.get('STRENGTH_WORDLIST_PATH')
+        self.STRENGTH_BATCH_MAX = _env_int('STRENGTH_BATCH_MAX', 1000)
+
+
+
+
+class DevelopmentConfig(Config):
+    pass
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+
+    def __init__(self):
+        super().__init__()
+        # A mesma chave assina os JWT e cifra o cofre: o padrão de desenvolvimento
+        # tornaria os tokens forjáveis e as senhas legíveis por qualquer um
+        if not os.environ.get('SECRET_KEY'):
+            raise RuntimeError('SECRET_KEY é obrigatória no perfil production')
+
+        # Modo SQLite ajustado: WAL deixa leitores e o escritor trabalharem em
+        # paralelo, NORMAL só faz fsync nos checkpoints e busy_timeout espera o
+        # lock em vez de falhar com "database is locked"
+        self.SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+            'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+            'foreign_keys': 'ON',
+        }
+
+
+class TestingConfig(Config):
+    TESTING = True
+
+    def __init__(self):
+        super().__init__()
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite://')
+        self.HASH_WORKERS = 0
+        self.RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', False)
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    """Instancia o perfil pedido (ou o de APP_CONFIG), lendo o ambiente neste momento"""
+    name = name or os.environ.get('APP_CONFIG', 'development')
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de configuração desconhecido: {name}")
+    return PROFILES[name]()
+
+
+def engine_options(config):
+    """Opções do engine conforme o banco: pool dimensionado ou ajustes do SQLite"""
+    options = dict(config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        busy_timeout = config['SQLITE_PRAGMAS'].get('busy_timeout')
+        if busy_timeout:
+            options.setdefault('connect_args', {'timeout': busy_timeout / 1000})
+        return options
+
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', True)
+    return options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Executa os PRAGMAs em toda conexão nova do pool"""
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
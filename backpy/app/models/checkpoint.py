@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+class MigrationCheckpoint(db.Model):
+    # Último id processado por uma migração em lotes, para retomar de onde parou
+    name = db.Column(db.String(64), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @classmethod
+    def load(cls, name):
+        checkpoint = db.session.get(cls, name)
+        if checkpoint is None:
+            checkpoint = cls(name=name, last_id=0)
+            db.session.add(checkpoint)
+        return checkpoint
+    
+    def __repr__(self):
+        return f'<MigrationCheckpoint {self.name}: {self.last_id}>'
@@ -0,0 +1,22 @@
+from app import db
+from datetime import datetime
+
+class GenerationEvent(db.Model):
+    # Uma geração feita por usuário autenticado: política usada e, se pedido, a senha cifrada
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    mode = db.Column(db.String(16), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=1)
+    # Opções efetivas da geração, em JSON
+    policy = db.Column(db.Text, nullable=False)
+    password = db.Column(db.String(255), nullable=True)
+    
+    # Paginação do histórico por usuário e poda por idade
+    __table_args__ = (
+        db.Index('ix_generation_event_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_generation_event_created', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<GenerationEvent {self.mode} user={self.user_id}>'
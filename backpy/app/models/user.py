@@ -1,50 +1,62 @@
 from app import db, login_manager
+from app.services.auth_cache import principal_cache
+from app.services.hashing import hashing_pool
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import os
+from app.services.keyring import get_keyring
+from app.services.search import create_search_index, drop_search_index
+import unicodedata
 
 # Encryption key for saved passwords
 def get_encryption_key():
-    secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
-    salt = b'password-manager-salt'  # This should ideally be stored securely
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
-    return key
+    return get_keyring().current_key
 
 # Encryption helper functions
 def encrypt_password(password):
-    cipher_suite = Fernet(get_encryption_key())
-    encrypted_password = cipher_suite.encrypt(password.encode())
-    return encrypted_password.decode()
+    return get_keyring().encrypt(password)
 
 def decrypt_password(encrypted_password):
-    cipher_suite = Fernet(get_encryption_key())
-    decrypted_password = cipher_suite.decrypt(encrypted_password.encode())
-    return decrypted_password.decode()
+    return get_keyring().decrypt(encrypted_password)
+
+# Forma de busca do nome: sem diferença de maiúsculas nem de acentos ("Café" -> "cafe")
+def normalize_name(name):
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def _name_normalized_default(context):
+    # Vale também para os INSERTs em lote do Core (importação e /batch)
+    return normalize_name(context.get_current_parameters()['name'])
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Incrementado a cada alteração no cofre; alimenta o ETag da listagem
+    vault_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     saved_passwords = db.relationship('SavedPassword', backref='owner', lazy='dynamic')
     
+    # O KDF roda no pool de hashing; ambos podem lançar HashingPoolBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing_pool.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hashing_pool.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return hashing_pool.needs_rehash(self.password_hash)
+    
+    def next_change_seq(self):
+        # A versão do cofre também serve de sequência de alterações para o sync
+        return self.reserve_change_seqs(1)
+    
+    def reserve_change_seqs(self, count):
+        # Reserva `count` sequências consecutivas e retorna a primeira; o
+        # incremento é feito no SQL para não perder atualizações concorrentes
+        self.vault_version = User.vault_version + count
+        db.session.flush()
+        return self.vault_version - count + 1
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -52,12 +64,31 @@ class User(UserMixin, db.Model):
 class SavedPassword(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # Nome normalizado para a busca; mantido junto com `name`
+    name_normalized = db.Column(db.String(100), nullable=True, default=_name_normalized_default)
     password = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Sequência da última alteração (vault_version do dono) e marca de exclusão lógica
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    
+    # Adiciona a restrição unique para name e user_id e os índices da paginação e do sync
+    __table_args__ = (
+        db.UniqueConstraint('name', 'user_id', name='_name_user_unique'),
+        db.Index('ix_saved_password_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_saved_password_user_change', 'user_id', 'change_seq'),
+        db.Index('ix_saved_password_user_name', 'user_id', 'name_normalized'),
+    )
     
-    # Adiciona a restrição unique para name e user_id
-    __table_args__ = (db.UniqueConstraint('name', 'user_id', name='_name_user_unique'),)
+    @db.validates('name')
+    def _normalize_name(self, key, name):
+        self.name_normalized = normalize_name(name) if name is not None else None
+        return name
+    
+    @classmethod
+    def active(cls):
+        return cls.query.filter(cls.deleted_at.is_(None))
     
     def set_password(self, raw_password):
         self.password = encrypt_password(raw_password)
@@ -65,9 +96,40 @@ class SavedPassword(db.Model):
     def get_password(self):
         return decrypt_password(self.password)
     
+    def get_password_or_none(self):
+        return get_keyring().decrypt_or_none(self.password)
+    
+    def mark_deleted(self, change_seq):
+        # Mantém só a lápide para o sync; o conteúdo cifrado é descartado
+        self.deleted_at = datetime.utcnow()
+        self.password = ''
+        self.change_seq = change_seq
+    
     def __repr__(self):
         return f'<SavedPassword {self.name}>'
 
+# Índice de busca por trecho do nome, criado e apagado junto com a tabela
+@db.event.listens_for(SavedPassword.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+@db.event.listens_for(SavedPassword.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
+
+# Campos que, alterados, invalidam o usuário no cache de autenticação
+PRINCIPAL_FIELDS = ('username', 'email', 'password_hash')
+
+@db.event.listens_for(User, 'after_update')
+def _invalidate_principal_on_update(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        principal_cache.invalidate_user(target.id)
+
+@db.event.listens_for(User, 'after_delete')
+def _invalidate_principal_on_delete(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
 @login_manager.user_loader
 def load_user(id):
     return User.query.get(int(id)) 
\ No newline at end of file
@@ -1,14 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 import jwt
 import datetime
-import os
 
 from app import db, token_required
 from app.models.user import User
+from app.services.hashing import HashingPoolBusy
+from app.services.rate_limit import rate_limit
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 def login():
     data = request.get_json()
     
@@ -23,14 +25,22 @@ def login():
     
     user = User.query.filter_by(username=username).first()
     
-    if not user or not user.check_password(password):
-        return jsonify({"message": "Credenciais inválidas"}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"message": "Credenciais inválidas"}), 401
+        
+        # Hash gerado com parâmetros antigos: atualiza aproveitando a senha em claro
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+    except HashingPoolBusy:
+        return _hashing_busy()
     
     # Gera o token JWT
     expiration = datetime.datetime.utcnow() + datetime.timedelta(days=1)
     token = jwt.encode(
         {"user_id": user.id, "exp": expiration},
-        os.environ.get('SECRET_KEY', 'dev-secret-key'),
+        current_app.config['SECRET_KEY'],
         algorithm="HS256"
     )
     
@@ -43,6 +53,7 @@ def login():
     }), 200
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register')
 def register():
     data = request.get_json()
     
@@ -67,7 +78,10 @@ def register():
     
     # Cria o usuário
     user = User(username=data['username'], email=data['email'])
-    user.set_password(data['password'])
+    try:
+        user.set_password(data['password'])
+    except HashingPoolBusy:
+        return _hashing_busy()
     
     db.session.add(user)
     db.session.commit()
@@ -77,6 +91,12 @@ def register():
         "user_id": user.id
     }), 201
 
+def _hashing_busy():
+    response = jsonify({"message": "Servidor ocupado. Tente novamente em instantes"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 @auth_bp.route('/user-info', methods=['GET'])
 @token_required
 def get_user_info(current_user):
@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify, current_app
+from app import token_required
+from app.models.history import GenerationEvent
+from app.routes.password import encode_cursor, decode_cursor
+from app.services.encoding import compress_response
+from app.services.keyring import get_keyring
+from app.services.rate_limit import rate_limit
+from sqlalchemy import and_, or_
+import json
+
+history_bp = Blueprint('history', __name__)
+history_bp.after_request(compress_response)
+
+HISTORY_PAGE_SIZE = 50
+
+# API do histórico de gerações - Requer autenticação
+@history_bp.route('/api/history', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
+@token_required
+def get_history(current_user):
+    limit = request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+    max_limit = current_app.config['PAGE_MAX_LIMIT']
+    if limit < 1 or limit > max_limit:
+        return jsonify({"message": f"limit deve estar entre 1 e {max_limit}"}), 400
+    
+    fields = request.args.get('fields', 'full')
+    if fields not in ('full', 'metadata'):
+        return jsonify({"message": "fields deve ser 'full' ou 'metadata'"}), 400
+    
+    query = GenerationEvent.query.filter_by(user_id=current_user.id).order_by(
+        GenerationEvent.created_at.desc(), GenerationEvent.id.desc()
+    )
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"message": "Cursor inválido"}), 400
+        # Keyset: continua logo após o último evento da página anterior
+        query = query.filter(or_(
+            GenerationEvent.created_at < created_at,
+            and_(GenerationEvent.created_at == created_at, GenerationEvent.id < last_id)
+        ))
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    keyring = get_keyring()
+    history = []
+    for event in rows:
+        entry = {
+            'id': event.id,
+            'created_at': event.created_at.isoformat(),
+            'mode': event.mode,
+            'count': event.count,
+            'policy': json.loads(event.policy),
+            'stored': event.password is not None
+        }
+        if fields == 'full':
+            # Só os eventos com valor guardado passam pela descriptografia
+            entry['password'] = keyring.decrypt_or_none(event.password) if event.password else None
+        history.append(entry)
+    
+    response = jsonify({
+        'history': history,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,91 @@
+from flask import Blueprint, Response
+
+from app.services.auth_cache import principal_cache
+from app.services.breach import breach_index
+from app.services.hashing import hashing_pool
+from app.services.history import history_writer
+from app.services.keyring import keyring_stats
+from app.services.metrics import metrics
+from app.services.policy import policy_cache_stats
+from app.services.rate_limit import limiter
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Exposição no formato texto do Prometheus
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def _keyring_collector():
+    stats = keyring_stats()
+    return [
+        ('keyring_key_derivations_total', 'counter', stats['key_derivations']),
+        ('keyring_cache_hits_total', 'counter', stats['cache_hits']),
+        ('keyring_cached_keys', 'gauge', stats['cached_keys']),
+    ]
+
+def _auth_cache_collector():
+    stats = principal_cache.stats()
+    return [
+        ('auth_cache_hits_total', 'counter', stats['hits']),
+        ('auth_cache_misses_total', 'counter', stats['misses']),
+        ('auth_cache_evictions_total', 'counter', stats['evictions']),
+        ('auth_cache_size', 'gauge', stats['size']),
+    ]
+
+def _hashing_pool_collector():
+    stats = hashing_pool.stats()
+    return [
+        ('hashing_pool_pending', 'gauge', stats['pending']),
+        ('hashing_pool_max_pending', 'gauge', stats['max_pending']),
+        ('hashing_pool_completed_total', 'counter', stats['completed']),
+        ('hashing_pool_rejected_total', 'counter', stats['rejected']),
+        ('hashing_pool_timeouts_total', 'counter', stats['timeouts']),
+        ('hashing_pool_failures_total', 'counter', stats['failures']),
+        ('hashing_pool_latency_seconds_max', 'gauge', stats['max_latency']),
+    ]
+
+def _breach_index_collector():
+    stats = breach_index.stats()
+    return [
+        ('breach_index_entries', 'gauge', stats['entries']),
+        ('breach_lookups_total', 'counter', stats['lookups']),
+        ('breach_bloom_rejections_total', 'counter', stats['bloom_rejections']),
+        ('breach_hits_total', 'counter', stats['hits']),
+    ]
+
+def _policy_cache_collector():
+    stats = policy_cache_stats()
+    return [
+        ('policy_cache_hits_total', 'counter', stats['hits']),
+        ('policy_cache_misses_total', 'counter', stats['misses']),
+        ('policy_cache_size', 'gauge', stats['size']),
+    ]
+
+def _rate_limit_collector():
+    stats = limiter.stats()
+    samples = [('rate_limit_rejected_total', 'counter', sum(stats['rejected'].values()))]
+    if 'keys' in stats:
+        samples.append(('rate_limit_keys', 'gauge', stats['keys']))
+        samples.append(('rate_limit_evictions_total', 'counter', stats['evictions']))
+    if 'errors' in stats:
+        samples.append(('rate_limit_backend_errors_total', 'counter', stats['errors']))
+    return samples
+
+def _history_collector():
+    stats = history_writer.stats()
+    return [
+        ('history_queue_size', 'gauge', stats['queued']),
+        ('history_recorded_total', 'counter', stats['recorded']),
+        ('history_written_total', 'counter', stats['written']),
+        ('history_dropped_total', 'counter', stats['dropped']),
+        ('history_failed_total', 'counter', stats['failed']),
+        ('history_pruned_total', 'counter', stats['pruned']),
+    ]
+
+_COLLECTORS = (_keyring_collector, _auth_cache_collector, _hashing_pool_collector, _breach_index_collector,
+               _policy_cache_collector, _rate_limit_collector, _history_collector)
+
+def register_collectors():
+    for collector in _COLLECTORS:
+        metrics.register_collector(collector)
@@ -1,9 +1,25 @@
-from flask import Blueprint, request, jsonify
-from app import db, token_required
-from app.models.user import SavedPassword, encrypt_password, decrypt_password
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from app import db, optional_principal, token_required
+from app.models.user import SavedPassword, encrypt_password, decrypt_password, normalize_name
+from app.services.breach import breach_index, find_breached
+from app.services.encoding import (compress_response, dumps, encoded_response, epoch,
+                                   negotiate_encoding, negotiate_format, to_columns)
+from app.services.generator import engine
+from app.services.history import history_writer
+from app.services.policy import PolicyError, policy_from_options
+from app.services.rate_limit import rate_limit
+from app.services.search import matching_ids
+from app.services.strength import strength_estimator
+from app.services.wordlist import wordlist
+from app.services.vault_io import (parse_import_stream, import_passwords, export_passwords,
+                                   apply_operations, NAME_MAX_LENGTH)
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import IntegrityError
-import random
-import string
+from datetime import datetime
+import base64
+import binascii
+import hashlib
+import time
 import logging
 
 # Configurar logger
@@ -12,8 +28,20 @@ logger = logging.getLogger(__name__)
 
 password_bp = Blueprint('password', __name__)
 
+# gzip/zstd negociado pelo Accept-Encoding em todas as respostas do blueprint
+password_bp.after_request(compress_response)
+
+# Linhas lidas do banco por vez ao transmitir o cofre
+STREAM_BATCH_SIZE = 100
+# Senhas geradas por vez nos lotes em NDJSON: a memória fica no tamanho da parte, não do lote
+GENERATE_STREAM_CHUNK = 1000
+
+BREACHED_GENERATION_MESSAGE = ("Não foi possível gerar uma senha fora da lista de vazamentos. "
+                               "Aumente o tamanho ou os tipos de caractere.")
+
 # API para gerar senha - Não requer autenticação
 @password_bp.route('/api/generate', methods=['POST'])
+@rate_limit('generate')
 def api_generate_password():
     logger.info("Gerando senha...")
     data = request.get_json()
@@ -21,28 +49,186 @@ def api_generate_password():
     if not data:
         return jsonify({"message": "Dados inválidos"}), 400
     
+    mode, generate, settings, error = _generator(data)
+    if error:
+        return jsonify({"message": error}), 400
+    
+    passwords = generate(1)
+    if _replace_breached(passwords, generate):
+        return jsonify({"message": BREACHED_GENERATION_MESSAGE}), 400
+    password = passwords[0]
+    _record_generation(mode, settings, data, 1, password)
+    
+    logger.info("Senha gerada com sucesso: %s***", password[:2])
+    return encoded_response({'password': password, 'message': 'Senha gerada com sucesso'}, fmt=negotiate_format())
+
+# API para gerar senhas em lote - Não requer autenticação
+@password_bp.route('/api/generate/batch', methods=['POST'])
+@rate_limit('generate_batch')
+def api_generate_password_batch():
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({"message": "Dados inválidos"}), 400
+    
+    count = data.get('count', 1)
+    max_count = current_app.config['BATCH_MAX_COUNT']
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > max_count:
+        return jsonify({"message": f"count deve ser um inteiro entre 1 e {max_count}"}), 400
+    
+    mode, generate, settings, error = _generator(data)
+    if error:
+        return jsonify({"message": error}), 400
+    
+    if count > current_app.config['BATCH_STREAM_THRESHOLD']:
+        return _stream_generated(mode, settings, data, count, generate)
+    
+    started = time.perf_counter()
+    passwords = generate(count)
+    if _replace_breached(passwords, generate):
+        return jsonify({"message": BREACHED_GENERATION_MESSAGE}), 400
+    elapsed = time.perf_counter() - started
+    logger.info("Lote de %d senhas gerado (%.0f senhas/s)", count, count / elapsed if elapsed else 0)
+    _record_generation(mode, settings, data, count, passwords[0])
+    
+    return encoded_response({
+        'passwords': passwords,
+        'count': count,
+        'message': 'Senhas geradas com sucesso'
+    }, fmt=negotiate_format())
+
+# API para avaliar a força de senhas - Não requer autenticação
+@password_bp.route('/api/strength', methods=['POST'])
+@rate_limit('strength')
+def api_password_strength():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Dados inválidos"}), 400
+    
+    if 'passwords' in data:
+        passwords = data['passwords']
+        max_count = current_app.config['STRENGTH_BATCH_MAX']
+        if not isinstance(passwords, list) or len(passwords) > max_count:
+            return jsonify({"message": f"passwords deve ser uma lista com até {max_count} senhas"}), 400
+    else:
+        passwords = [data.get('password')]
+    if not all(isinstance(password, str) for password in passwords):
+        return jsonify({"message": "As senhas devem ser textos"}), 400
+    policy, error = _request_policy(data)
+    if error:
+        return jsonify({"message": error}), 400
+    
+    results = strength_estimator.estimate_many(passwords)
+    if policy is not None:
+        for password, result in zip(passwords, results):
+            result['policy_violations'] = policy.violations(password)
+    if 'passwords' in data:
+        return encoded_response({'results': results}, fmt=negotiate_format())
+    return encoded_response(results[0], fmt=negotiate_format())
+
+def _replace_breached(passwords, generate):
+    """Troca as senhas geradas que estão no índice de vazamentos; retorna quantas sobraram"""
+    flagged = find_breached(passwords)
+    for _ in range(current_app.config['BREACH_MAX_RETRIES']):
+        if not flagged:
+            break
+        replacements = generate(len(flagged))
+        for index, password in zip(flagged, replacements):
+            passwords[index] = password
+        # Só as substitutas precisam de nova consulta
+        still = find_breached(replacements)
+        flagged = [flagged[i] for i in still]
+    return len(flagged)
+
+def _generator(data):
+    """Gerador do modo pedido e suas opções efetivas; retorna (modo, gerador, opções, erro)"""
+    if data.get('mode') == 'passphrase':
+        generate, options, error = _passphrase_generator(data)
+        return 'passphrase', generate, options, error
+    policy, error = _generation_policy(data)
+    if error:
+        return 'random', None, None, error
+    return 'random', lambda count: engine.generate_policy_batch(count, policy), policy.summary(), None
+
+def _stream_generated(mode, settings, data, count, generate):
+    """Lote grande em NDJSON, uma senha por linha, gerado parte a parte enquanto é enviado"""
+    # A primeira parte sai antes da resposta: uma política que só produz senhas
+    # vazadas ainda recebe 400, e não um corpo interrompido
+    first = generate(min(count, GENERATE_STREAM_CHUNK))
+    if _replace_breached(first, generate):
+        return jsonify({"message": BREACHED_GENERATION_MESSAGE}), 400
+    _record_generation(mode, settings, data, count)
+    
+    def stream():
+        passwords = first
+        remaining = count - len(first)
+        while True:
+            yield ''.join(dumps({'password': password}) + '\n' for password in passwords)
+            if not remaining:
+                return
+            passwords = generate(min(remaining, GENERATE_STREAM_CHUNK))
+            if _replace_breached(passwords, generate):
+                # Status já enviado: o erro vai como última linha, sem a chave password
+                yield dumps({'message': BREACHED_GENERATION_MESSAGE}) + '\n'
+                return
+            remaining -= len(passwords)
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+def _record_generation(mode, settings, data, count, password=None):
+    # Só gerações autenticadas entram no histórico; a gravação fica com a fila
+    # write-behind e a resposta não espera nenhum commit
+    if not history_writer.enabled:
+        return
+    user = optional_principal()
+    if user is None:
+        return
+    # O valor só é guardado (cifrado) quando pedido, e apenas em gerações individuais
+    stored = password if count == 1 and data.get('store_in_history') is True else None
+    history_writer.record(user.id, mode, settings, count, stored)
+
+def _passphrase_generator(data):
+    """Valida as opções do modo frase secreta; retorna (gerador, opções, mensagem de erro)"""
+    words = data.get('words', 6)
+    max_words = current_app.config['PASSPHRASE_MAX_WORDS']
+    if not isinstance(words, int) or isinstance(words, bool) or words < 1 or words > max_words:
+        return None, None, f"words deve ser um inteiro entre 1 e {max_words}"
+    separator = data.get('separator', '-')
+    if not isinstance(separator, str) or len(separator) > 3:
+        return None, None, "separator deve ser um texto com até 3 caracteres"
+    options = {
+        'words': words,
+        'separator': separator,
+        'capitalize': bool(data.get('capitalize', False)),
+        'include_number': bool(data.get('include_number', False)),
+    }
+    return lambda count: engine.generate_passphrase_batch(count, wordlist, **options), options, None
+
+def _generation_policy(data):
+    """Política compilada (e memoizada) a partir das opções do pedido; retorna (política, erro)"""
+    max_length = current_app.config['BATCH_MAX_LENGTH']
     length = data.get('length', 12)
-    include_uppercase = data.get('include_uppercase', True)
-    include_lowercase = data.get('include_lowercase', True)
-    include_numbers = data.get('include_numbers', True)
-    include_symbols = data.get('include_symbols', True)
-    
-    password = generate_password(
-        length=length,
-        include_uppercase=include_uppercase,
-        include_lowercase=include_lowercase,
-        include_numbers=include_numbers,
-        include_symbols=include_symbols
-    )
-    
-    logger.info(f"Senha gerada com sucesso: {password[:2]}***")
-    return jsonify({'password': password, 'message': 'Senha gerada com sucesso'})
+    if not isinstance(length, int) or isinstance(length, bool) or length < 1 or length > max_length:
+        return None, f"length deve ser um inteiro entre 1 e {max_length}"
+    try:
+        return policy_from_options(data), None
+    except PolicyError as e:
+        return None, str(e)
+
+def _request_policy(data):
+    """Política opcional enviada em `policy` para validar senhas; retorna (política, erro)"""
+    if data.get('policy') is None:
+        return None, None
+    try:
+        return policy_from_options(data['policy'], default_length=1), None
+    except PolicyError as e:
+        return None, str(e)
 
 # API para salvar senha - Requer autenticação
 @password_bp.route('/api/passwords', methods=['POST'])
+@rate_limit('vault_write', per=('ip', 'user'))
 @token_required
 def save_password(current_user):
-    logger.info(f"Salvando senha para usuário: {current_user.username}")
+    logger.info("Salvando senha para usuário: %s", current_user.username)
     data = request.get_json()
     
     if not data:
@@ -54,31 +240,55 @@ def save_password(current_user):
         logger.warning("Nome ou senha não fornecidos")
         return jsonify({"message": "Nome e senha são campos obrigatórios"}), 400
     
+    # Política opcional do cliente (tamanho mínimo, mínimos por classe, caracteres permitidos)
+    policy, error = _request_policy(data)
+    if error:
+        return jsonify({"message": error}), 400
+    if policy is not None and isinstance(data.get('password'), str):
+        violations = policy.violations(data.get('password'))
+        if violations:
+            return jsonify({"message": violations[0], "violations": violations}), 400
+    
+    # Consulta local ao índice de vazamentos, antes de qualquer acesso ao banco
+    if isinstance(data.get('password'), str) and breach_index.contains(data.get('password')):
+        logger.warning("Senha encontrada no índice de vazamentos")
+        return jsonify({
+            "message": "Esta senha aparece em vazamentos conhecidos. Escolha outra senha.",
+            "breached": True
+        }), 400
+    
     # Verifica se já existe uma senha com este nome para o usuário
     existing_password = SavedPassword.query.filter_by(
         user_id=current_user.id,
         name=data.get('name')
     ).first()
     
-    if existing_password:
-        logger.warning(f"Tentativa de criar senha com nome duplicado: {data.get('name')}")
+    if existing_password and existing_password.deleted_at is None:
+        logger.warning("Tentativa de criar senha com nome duplicado: %s", data.get('name'))
         return jsonify({
             "message": "Já existe uma senha com este nome. Escolha um nome diferente."
         }), 400
     
-    # Cria nova senha
-    password = SavedPassword(
-        name=data.get('name'),
-        user_id=current_user.id
-    )
+    if existing_password:
+        # Reaproveita a lápide com o mesmo nome, que ocupa a restrição unique
+        password = existing_password
+        password.deleted_at = None
+        password.created_at = datetime.utcnow()
+    else:
+        # Cria nova senha
+        password = SavedPassword(
+            name=data.get('name'),
+            user_id=current_user.id
+        )
     
     # Use the encryption method to set the password
     try:
         password.set_password(data.get('password'))
         
         db.session.add(password)
+        password.change_seq = current_user.next_change_seq()
         db.session.commit()
-        logger.info(f"Senha salva com sucesso. ID: {password.id}")
+        logger.info("Senha salva com sucesso. ID: %s", password.id)
         
         return jsonify({
             "message": "Senha salva com sucesso", 
@@ -86,110 +296,401 @@ def save_password(current_user):
         }), 201
     except IntegrityError:
         db.session.rollback()
-        logger.error(f"Erro de integridade ao salvar senha: nome duplicado")
+        logger.error("Erro de integridade ao salvar senha: nome duplicado")
         return jsonify({
             "message": "Já existe uma senha com este nome. Escolha um nome diferente."
         }), 400
     except Exception as e:
-        logger.error(f"Erro ao salvar senha: {str(e)}")
+        logger.error("Erro ao salvar senha: %s", e)
         db.session.rollback()
         return jsonify({"message": f"Erro ao salvar senha: {str(e)}"}), 500
 
 # API para listar senhas - Requer autenticação
 @password_bp.route('/api/passwords', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
 @token_required
 def get_passwords(current_user):
-    logger.info(f"Obtendo senhas para usuário: {current_user.username}")
-    saved_passwords = current_user.saved_passwords.order_by(SavedPassword.created_at.desc()).all()
+    logger.info("Obtendo senhas para usuário: %s", current_user.username)
+    
+    limit = request.args.get('limit', type=int)
+    max_limit = current_app.config['PAGE_MAX_LIMIT']
+    if limit is not None and (limit < 1 or limit > max_limit):
+        return jsonify({"message": f"limit deve estar entre 1 e {max_limit}"}), 400
     
-    passwords_list = []
-    for password in saved_passwords:
+    fields = request.args.get('fields', 'full')
+    if fields not in ('full', 'metadata'):
+        return jsonify({"message": "fields deve ser 'full' ou 'metadata'"}), 400
+    
+    # Busca opcional pelo nome (sem diferenciar maiúsculas e acentos); só as
+    # linhas encontradas são descriptografadas
+    search = None
+    q = request.args.get('q')
+    if q is not None:
+        match = request.args.get('match', 'substring')
+        if match not in ('substring', 'prefix'):
+            return jsonify({"message": "match deve ser 'substring' ou 'prefix'"}), 400
+        term = normalize_name(q.strip())
+        if not term or len(term) > NAME_MAX_LENGTH:
+            return jsonify({"message": f"q deve ter entre 1 e {NAME_MAX_LENGTH} caracteres"}), 400
+        search = (term, match)
+    
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
         try:
-            # Tenta descriptografar a senha
-            decrypted_password = password.get_password()
-        except Exception as e:
-            logger.warning(f"Erro ao descriptografar senha, usando texto original: {str(e)}")
-            # Se falhar, assume que a senha está em texto simples e atualiza para criptografada
-            decrypted_password = password.password
-            # Atualiza a senha para o formato criptografado
-            try:
-                password.set_password(decrypted_password)
-                db.session.commit()
-            except Exception as encrypt_error:
-                logger.error(f"Erro ao criptografar senha: {str(encrypt_error)}")
-                db.session.rollback()
-            
-        passwords_list.append({
+            after = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"message": "Cursor inválido"}), 400
+    
+    # O ETag depende só da versão do cofre e dos parâmetros; um cofre
+    # inalterado responde 304 sem consultar a tabela de senhas
+    etag = vault_etag(current_user)
+    fmt = negotiate_format()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif fmt != 'json':
+        # Formatos compactos: um vetor por coluna e datas em segundos desde a época
+        response = _compact_passwords(current_user.id, after, limit, fields == 'metadata', fmt, search)
+    else:
+        stream = _stream_passwords(current_user.id, after, limit, metadata_only=fields == 'metadata', search=search)
+        response = Response(stream_with_context(stream), mimetype='application/json')
+        response.vary.add('Accept')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# API para revelar uma senha - Requer autenticação
+@password_bp.route('/api/passwords/<int:id>/reveal', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
+@token_required
+def reveal_password(current_user, id):
+    password = SavedPassword.active().filter_by(id=id, user_id=current_user.id).first_or_404()
+    return encoded_response({
+        'id': password.id,
+        'name': password.name,
+        'password': _decrypt_entry(password),
+        'created_at': password.created_at.isoformat()
+    }, fmt=negotiate_format())
+
+# API de auditoria do cofre - Requer autenticação
+@password_bp.route('/api/passwords/audit', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
+@token_required
+def audit_passwords(current_user):
+    """Nota de força de cada senha salva, sem devolver as senhas"""
+    query = SavedPassword.active().filter_by(user_id=current_user.id).order_by(SavedPassword.id)
+    results = []
+    summary = [0] * 5
+    batch = []
+    
+    def flush():
+        # Senhas ilegíveis (texto simples legado ou chave desconhecida) ficam sem nota
+        readable = [(entry, password) for entry, password in batch if password is not None]
+        scores = strength_estimator.estimate_many(password for _, password in readable)
+        for (entry, _), score in zip(readable, scores):
+            entry.update(score=score['score'], guesses_log10=score['guesses_log10'],
+                         breached=any(p['pattern'] == 'breach' for p in score['patterns']))
+            summary[score['score']] += 1
+        results.extend(entry for entry, _ in batch)
+        batch.clear()
+    
+    for password in query.yield_per(STREAM_BATCH_SIZE):
+        entry = {'id': password.id, 'name': password.name, 'score': None}
+        batch.append((entry, _decrypt_entry(password)))
+        if len(batch) == STREAM_BATCH_SIZE:
+            flush()
+    flush()
+    
+    return encoded_response({'results': results, 'scores': summary}, fmt=negotiate_format())
+
+def vault_etag(user):
+    # Cada formato e compressão negociados é uma representação com ETag próprio
+    variant = f"{negotiate_format()}|{negotiate_encoding()}".encode()
+    digest = hashlib.sha1(request.query_string + b'|' + variant).hexdigest()[:16]
+    return f"{user.id}-{user.vault_version}-{digest}"
+
+def _password_query(user_id, after, limit, metadata_only, search=None):
+    query = SavedPassword.active()
+    matches = matching_ids(db.engine, search[0]) if search and search[1] == 'substring' else None
+    if matches is not None:
+        # Parte das linhas do índice de trechos e ordena só elas. O `+ 0` impede o
+        # SQLite de preferir o índice (user_id, created_at), que evita a ordenação
+        # mas percorre todas as senhas do usuário
+        query = query.filter(SavedPassword.id.in_(matches), SavedPassword.user_id + 0 == user_id)
+    else:
+        query = query.filter_by(user_id=user_id)
+        if search:
+            query = query.filter(_search_filter(*search))
+    query = query.order_by(SavedPassword.created_at.desc(), SavedPassword.id.desc())
+    if metadata_only:
+        # Sem a coluna cifrada, nenhuma operação Fernet é necessária
+        query = query.with_entities(SavedPassword.id, SavedPassword.name, SavedPassword.created_at)
+    if after:
+        created_at, last_id = after
+        # Keyset: continua logo após a última linha da página anterior
+        query = query.filter(or_(
+            SavedPassword.created_at < created_at,
+            and_(SavedPassword.created_at == created_at, SavedPassword.id < last_id)
+        ))
+    if limit is not None:
+        # Uma linha extra indica se existe próxima página
+        query = query.limit(limit + 1)
+    return query
+
+def _search_filter(term, match):
+    if match == 'prefix':
+        # Faixa contínua no índice (user_id, name_normalized); só as linhas da faixa são ordenadas
+        return and_(SavedPassword.name_normalized >= term,
+                    SavedPassword.name_normalized < term + '\U0010ffff')
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    # Sem o índice de trechos (outro banco ou termo curto): o LIKE percorre todas as senhas do usuário
+    return SavedPassword.name_normalized.like(f'%{escaped}%', escape='\\')
+
+def _stream_passwords(user_id, after, limit, metadata_only=False, search=None):
+    # A consulta é montada dentro do gerador para usar a sessão do contexto do streaming
+    query = _password_query(user_id, after, limit, metadata_only, search)
+    
+    yield '{"passwords": ['
+    
+    count = 0
+    last = None
+    has_more = False
+    for password in query.yield_per(STREAM_BATCH_SIZE):
+        if limit is not None and count == limit:
+            has_more = True
+            break
+        
+        entry = {
             'id': password.id,
             'name': password.name,
-            'password': decrypted_password,
             'created_at': password.created_at.isoformat()
-        })
+        }
+        if not metadata_only:
+            entry['password'] = _decrypt_entry(password)
+        
+        item = dumps(entry)
+        yield ',' + item if count else item
+        count += 1
+        last = password
     
-    logger.info(f"Retornando {len(passwords_list)} senhas")
-    return jsonify({'passwords': passwords_list})
+    next_cursor = encode_cursor(last) if has_more else None
+    yield '], "next_cursor": ' + dumps(next_cursor) + '}'
+    logger.info("Retornando %d senhas", count)
+
+def _compact_passwords(user_id, after, limit, metadata_only, fmt, search=None):
+    columns = {'id': [], 'name': [], 'created_at': []}
+    if not metadata_only:
+        columns['password'] = []
+    
+    last = None
+    has_more = False
+    for password in _password_query(user_id, after, limit, metadata_only, search).yield_per(STREAM_BATCH_SIZE):
+        if limit is not None and len(columns['id']) == limit:
+            has_more = True
+            break
+        columns['id'].append(password.id)
+        columns['name'].append(password.name)
+        columns['created_at'].append(epoch(password.created_at))
+        if not metadata_only:
+            columns['password'].append(_decrypt_entry(password))
+        last = password
+    
+    logger.info("Retornando %d senhas (%s)", len(columns['id']), fmt)
+    next_cursor = encode_cursor(last) if has_more else None
+    return encoded_response({'passwords': columns, 'next_cursor': next_cursor}, fmt=fmt)
+
+def _decrypt_entry(password):
+    decrypted = password.get_password_or_none()
+    if decrypted is None:
+        # Linha legada em texto simples ou de chave desconhecida: `flask migrate-plaintext`
+        logger.warning("Não foi possível descriptografar a senha ID %s", password.id)
+    return decrypted
+
+def encode_cursor(password):
+    raw = f"{password.created_at.isoformat()}|{password.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, last_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError('cursor inválido')
+
+# Cursor do sync: a sequência (inteiro) quando a página esgota as alterações,
+# ou "sequência:id" no meio delas, já que várias linhas podem ter a mesma sequência
+def encode_change_cursor(change_seq, row_id):
+    return f'{change_seq}:{row_id}'
+
+def decode_change_cursor(value):
+    change_seq, separator, row_id = value.partition(':')
+    try:
+        return int(change_seq), int(row_id) if separator else None
+    except ValueError:
+        raise ValueError('cursor inválido')
+
+# API de sincronização incremental - Requer autenticação
+@password_bp.route('/api/passwords/changes', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
+@token_required
+def get_password_changes(current_user):
+    try:
+        since, last_id = decode_change_cursor(request.args.get('since', '0'))
+    except ValueError:
+        return jsonify({"message": "since inválido"}), 400
+    limit = request.args.get('limit', current_app.config['PAGE_MAX_LIMIT'], type=int)
+    max_limit = current_app.config['PAGE_MAX_LIMIT']
+    if limit < 1 or limit > max_limit:
+        return jsonify({"message": f"limit deve estar entre 1 e {max_limit}"}), 400
+    metadata_only = request.args.get('fields', 'full') == 'metadata'
+    fmt = negotiate_format()
+    # Lida antes das linhas: uma escrita confirmada depois da consulta fica acima
+    # do cursor e vem na próxima chamada, em vez de ser pulada
+    version = current_user.vault_version
+    
+    # Nada mudou desde o cursor: responde sem consultar a tabela de senhas
+    if last_id is None and since and since >= version:
+        return encoded_response({'changes': [], 'deleted': [], 'cursor': since, 'has_more': False}, fmt=fmt)
+    
+    query = SavedPassword.query.filter_by(user_id=current_user.id)
+    if last_id is not None:
+        # Continuação de página: retoma depois de (change_seq, id), a mesma ordem do ORDER BY
+        query = query.filter(SavedPassword.change_seq >= since,
+                             or_(SavedPassword.change_seq > since, SavedPassword.id > last_id))
+    elif since:
+        query = query.filter(SavedPassword.change_seq > since)
+    else:
+        # Sincronização inicial: as lápides não interessam a um cliente vazio
+        query = query.filter(SavedPassword.deleted_at.is_(None))
+    rows = query.order_by(SavedPassword.change_seq, SavedPassword.id).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    changes = []
+    deleted = []
+    for password in rows:
+        if password.deleted_at is not None:
+            deleted.append(password.id)
+            continue
+        entry = {
+            'id': password.id,
+            'name': password.name,
+            'created_at': password.created_at.isoformat() if fmt == 'json' else epoch(password.created_at),
+            'change_seq': password.change_seq
+        }
+        if not metadata_only:
+            entry['password'] = _decrypt_entry(password)
+        changes.append(entry)
+    
+    if has_more:
+        cursor = encode_change_cursor(rows[-1].change_seq, rows[-1].id)
+    else:
+        cursor = max(version, since)
+    
+    if fmt != 'json':
+        fields = ['id', 'name', 'created_at', 'change_seq'] + ([] if metadata_only else ['password'])
+        changes = to_columns(changes, fields)
+    return encoded_response({'changes': changes, 'deleted': deleted, 'cursor': cursor, 'has_more': has_more}, fmt=fmt)
+
+# API para importar senhas em lote - Requer autenticação
+@password_bp.route('/api/passwords/import', methods=['POST'])
+@rate_limit('vault_write', per=('ip', 'user'))
+@token_required
+def import_saved_passwords(current_user):
+    content_type = request.mimetype or ''
+    logger.info("Importando senhas (%s) para usuário: %s", content_type, current_user.username)
+    
+    if content_type == 'application/json':
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('passwords')
+        if not isinstance(data, list):
+            return jsonify({"message": "Dados inválidos"}), 400
+        rows = (item if isinstance(item, dict) else None for item in data)
+    elif content_type in ('text/csv', 'application/x-ndjson'):
+        # CSV e NDJSON são lidos direto do corpo, sem carregá-lo na memória
+        rows = parse_import_stream(request.stream, content_type)
+    else:
+        return jsonify({"message": "Formato não suportado. Use text/csv, application/x-ndjson ou application/json"}), 415
+    
+    try:
+        result = import_passwords(current_user, rows)
+    except UnicodeDecodeError:
+        return jsonify({"message": "O arquivo deve estar em UTF-8"}), 400
+    except Exception as e:
+        logger.error("Erro ao importar senhas: %s", e)
+        return jsonify({"message": f"Erro ao importar senhas: {str(e)}"}), 500
+    
+    logger.info("%s senhas importadas, %s conflitos", result['imported'], len(result['conflicts']))
+    return jsonify(dict(result, message="Importação concluída")), 200
+
+# API para exportar senhas - Requer autenticação
+@password_bp.route('/api/passwords/export', methods=['GET'])
+@rate_limit('vault_read', per=('ip', 'user'))
+@token_required
+def export_saved_passwords(current_user):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"message": "format deve ser 'csv' ou 'ndjson'"}), 400
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(export_passwords(current_user.id, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=senhas.{fmt}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# API de alterações em lote (criar, renomear, atualizar, excluir) - Requer autenticação
+@password_bp.route('/api/passwords/batch', methods=['POST'])
+@rate_limit('vault_write', per=('ip', 'user'))
+@token_required
+def batch_password_operations(current_user):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        return jsonify({"message": "Dados inválidos"}), 400
+    
+    operations = data['operations']
+    max_operations = current_app.config['MUTATION_BATCH_MAX']
+    if not operations or len(operations) > max_operations:
+        return jsonify({"message": f"operations deve ter entre 1 e {max_operations} itens"}), 400
+    atomic = bool(data.get('atomic', True))
+    logger.info("Aplicando %s operações em lote para usuário: %s", len(operations), current_user.username)
+    
+    try:
+        result = apply_operations(current_user, operations, atomic=atomic)
+    except IntegrityError:
+        logger.error("Erro de integridade no lote: nome duplicado")
+        return jsonify({"message": "Já existe uma senha com este nome. Escolha um nome diferente."}), 409
+    except Exception as e:
+        logger.error("Erro ao aplicar operações em lote: %s", e)
+        return jsonify({"message": f"Erro ao aplicar operações: {str(e)}"}), 500
+    
+    if not result['applied']:
+        logger.warning("Lote recusado: %s operações inválidas", result['failed'])
+        return jsonify(dict(result, message="Nenhuma operação foi aplicada")), 400
+    return jsonify(dict(result, message="Operações aplicadas")), 200
 
 # API para excluir senha - Requer autenticação
 @password_bp.route('/api/passwords/<int:id>', methods=['DELETE'])
+@rate_limit('vault_write', per=('ip', 'user'))
 @token_required
 def delete_password(current_user, id):
-    logger.info(f"Excluindo senha ID {id} para usuário: {current_user.username}")
-    password = SavedPassword.query.get_or_404(id)
+    logger.info("Excluindo senha ID %s para usuário: %s", id, current_user.username)
+    password = SavedPassword.active().filter_by(id=id).first_or_404()
     
     # Verifica se a senha pertence ao usuário atual
     if password.user_id != current_user.id:
-        logger.warning(f"Tentativa não autorizada de excluir senha ID {id}")
+        logger.warning("Tentativa não autorizada de excluir senha ID %s", id)
         return jsonify({"message": "Você não tem permissão para excluir esta senha"}), 403
     
     try:
-        db.session.delete(password)
+        # Exclusão lógica: a lápide informa o sync dos clientes
+        password.mark_deleted(current_user.next_change_seq())
         db.session.commit()
-        logger.info(f"Senha ID {id} excluída com sucesso")
+        logger.info("Senha ID %s excluída com sucesso", id)
         return jsonify({"message": "Senha excluída com sucesso"}), 200
     except Exception as e:
-        logger.error(f"Erro ao excluir senha: {str(e)}")
+        logger.error("Erro ao excluir senha: %s", e)
         db.session.rollback()
         return jsonify({"message": f"Erro ao excluir senha: {str(e)}"}), 500
-
-def generate_password(length, include_uppercase, include_lowercase, include_numbers, include_symbols):
-    # Define character sets
-    uppercase_chars = string.ascii_uppercase
-    lowercase_chars = string.ascii_lowercase
-    number_chars = string.digits
-    symbol_chars = string.punctuation
-    
-    # Create a pool of characters based on selected options
-    char_pool = ''
-    if include_uppercase:
-        char_pool += uppercase_chars
-    if include_lowercase:
-        char_pool += lowercase_chars
-    if include_numbers:
-        char_pool += number_chars
-    if include_symbols:
-        char_pool += symbol_chars
-    
-    # If no character sets were selected, default to lowercase
-    if not char_pool:
-        char_pool = lowercase_chars
-    
-    # Generate password
-    password = ''.join(random.choice(char_pool) for _ in range(length))
-    
-    # Ensure at least one character from each selected character set
-    required_chars = []
-    if include_uppercase and not any(c in uppercase_chars for c in password):
-        required_chars.append(random.choice(uppercase_chars))
-    if include_lowercase and not any(c in lowercase_chars for c in password):
-        required_chars.append(random.choice(lowercase_chars))
-    if include_numbers and not any(c in number_chars for c in password):
-        required_chars.append(random.choice(number_chars))
-    if include_symbols and not any(c in symbol_chars for c in password):
-        required_chars.append(random.choice(symbol_chars))
-    
-    # Replace random positions in the password with required characters
-    for char in required_chars:
-        position = random.randint(0, length - 1)
-        password = password[:position] + char + password[position+1:]
-    
-    return password 
\ No newline at end of file
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g
+
+
+class Principal:
+    """Usuário autenticado em cache: só os campos imutáveis ficam guardados.
+
+    Qualquer outro atributo (ex.: vault_version, métodos do modelo) carrega o
+    User do banco sob demanda, uma vez por requisição.
+    """
+
+    __slots__ = ('id', 'username', 'email', 'created_at')
+
+    def __init__(self, id, username, email, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.created_at)
+
+    @property
+    def user(self):
+        from app import db
+        from app.models.user import User
+
+        loaded = self._loaded_users()
+        if self.id not in loaded:
+            loaded[self.id] = db.session.get(User, self.id)
+        return loaded[self.id]
+
+    def remember(self, user):
+        # Reaproveita o User já carregado nesta requisição
+        self._loaded_users()[self.id] = user
+
+    @staticmethod
+    def _loaded_users():
+        if '_principal_users' not in g:
+            g._principal_users = {}
+        return g._principal_users
+
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+class PrincipalCache:
+    """LRU com TTL de token JWT verificado -> Principal.
+
+    O cache é do processo: `invalidate_user` só limpa as entradas do próprio
+    worker. Nos demais, um usuário alterado ou excluído continua aceito até a
+    entrada expirar, então o TTL (AUTH_CACHE_TTL) é o prazo máximo de revogação.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return principal
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def peek(self, token):
+        """Id do usuário de um token já verificado, sem mexer no LRU nem nas estatísticas"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                return None
+            return principal.id
+
+    def put(self, token, principal, token_exp=None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        if token_exp is not None:
+            # Nunca guarda o token além da expiração do próprio JWT
+            expires_at = min(expires_at, time.monotonic() + (token_exp - time.time()))
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        # Remove as entradas do usuário: nada fica guardado além do próprio LRU.
+        # A varredura é limitada por maxsize e só roda quando o usuário muda
+        with self._lock:
+            stale = [token for token, (principal, _) in self._entries.items() if principal.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,266 @@
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+
+from app.services.metrics import metrics
+
+# Layout do arquivo (inteiros big-endian):
+#
+#   cabeçalho | fanout (65537 x uint64) | tabela (N x 8 bytes) | filtro de Bloom
+#
+# A tabela guarda os 8 primeiros bytes do SHA-1 de cada senha vazada, ordenados
+# e sem repetição; o fanout aponta o início do trecho de cada prefixo de 16 bits.
+MAGIC = b'BRCHIDX1'
+HEADER = struct.Struct('>8sQQQI')  # magic, entradas, bits do Bloom, offset do Bloom, hashes do Bloom
+FANOUT = struct.Struct('>65537Q')
+ENTRY_SIZE = 8
+TABLE_OFFSET = HEADER.size + FANOUT.size
+
+BUILD_CHUNK_SIZE = 2_000_000
+
+
+def hash_prefix(password):
+    """Prefixo de 64 bits do SHA-1 da senha, o mesmo formato dos dumps do HIBP"""
+    return hashlib.sha1(password.encode('utf-8')).digest()[:ENTRY_SIZE]
+
+
+def _bloom_positions(prefix, bits, hashes):
+    # Hash duplo (Kirsch-Mitzenmacher): o SHA-1 já é uniforme, basta fatiá-lo
+    value = int.from_bytes(prefix, 'big')
+    h1 = value >> 32
+    h2 = (value & 0xFFFFFFFF) | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class BreachIndex:
+    """Consulta offline de senhas vazadas em um índice mapeado em memória.
+
+    O arquivo é aberto com `mmap`: só as páginas tocadas pelo filtro de Bloom e
+    pela busca binária entram na memória, então índices com centenas de milhões
+    de hashes custam quase nada de RSS. Sem arquivo configurado, toda consulta
+    responde "não vazada".
+    """
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'bloom_rejections': 0, 'hits': 0}
+        self._file = None
+        self._mmap = None
+        self.path = None
+        self.entries = 0
+        if path:
+            self.open(path)
+
+    @property
+    def enabled(self):
+        return self._mmap is not None
+
+    def configure(self, path):
+        self.close()
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        f = open(path, 'rb')
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            f.close()
+            raise ValueError(f'Índice de vazamentos vazio: {path}')
+        magic, entries, bloom_bits, bloom_offset, bloom_hashes = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            data.close()
+            f.close()
+            raise ValueError(f'Arquivo não é um índice de vazamentos: {path}')
+        self._file = f
+        self._mmap = data
+        self._fanout = FANOUT.unpack_from(data, HEADER.size)
+        self._bloom_bits = bloom_bits
+        self._bloom_offset = bloom_offset
+        self._bloom_hashes = bloom_hashes
+        self.entries = entries
+        self.path = path
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = None
+        self._file = None
+        self.path = None
+        self.entries = 0
+
+    def contains(self, password):
+        return self.contains_many([password])[0]
+
+    def contains_many(self, passwords):
+        """Uma flag por senha, na ordem recebida.
+
+        Os prefixos são consultados em ordem crescente: cada busca binária
+        começa onde a anterior parou e os acessos ao mapa andam sempre para frente.
+        """
+        passwords = list(passwords)
+        if not self.enabled or not passwords:
+            return [False] * len(passwords)
+
+        with metrics.timer('hot_path_duration_seconds', operation='breach_lookup'):
+            prefixes = [hash_prefix(password) for password in passwords]
+            found = [False] * len(prefixes)
+            rejected = 0
+            position = 0
+            for index in sorted(range(len(prefixes)), key=prefixes.__getitem__):
+                prefix = prefixes[index]
+                if not self._bloom_contains(prefix):
+                    rejected += 1
+                    continue
+                found[index], position = self._search(prefix, position)
+
+        with self._lock:
+            self._stats['lookups'] += len(prefixes)
+            self._stats['bloom_rejections'] += rejected
+            self._stats['hits'] += sum(found)
+        return found
+
+    def _bloom_contains(self, prefix):
+        data = self._mmap
+        offset = self._bloom_offset
+        for bit in _bloom_positions(prefix, self._bloom_bits, self._bloom_hashes):
+            if not data[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _search(self, prefix, start):
+        bucket = int.from_bytes(prefix[:2], 'big')
+        lo = max(self._fanout[bucket], start)
+        hi = self._fanout[bucket + 1]
+        data = self._mmap
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = TABLE_OFFSET + mid * ENTRY_SIZE
+            if data[offset:offset + ENTRY_SIZE] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        offset = TABLE_OFFSET + lo * ENTRY_SIZE
+        return lo < self.entries and data[offset:offset + ENTRY_SIZE] == prefix, lo
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=self.entries)
+
+
+def _read_prefixes(source, fmt):
+    """Prefixos de 64 bits de um dump local: `hibp` (SHA1:contagem) ou `plaintext`"""
+    with open(source, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if fmt == 'plaintext':
+                yield int.from_bytes(hashlib.sha1(line).digest()[:ENTRY_SIZE], 'big')
+                continue
+            digest = line.split(b':', 1)[0]
+            if len(digest) != 40:
+                continue
+            try:
+                yield int(digest[:16], 16)
+            except ValueError:
+                continue
+
+
+def _write_run(values, directory):
+    # Cada execução é gravada ordenada e em big-endian para a intercalação
+    values = array('Q', sorted(values))
+    if sys.byteorder == 'little':
+        values.byteswap()
+    run = tempfile.TemporaryFile(dir=directory)
+    values.tofile(run)
+    run.seek(0)
+    return run
+
+
+def _iter_run(run):
+    while True:
+        block = run.read(ENTRY_SIZE * 65536)
+        if not block:
+            return
+        for offset in range(0, len(block), ENTRY_SIZE):
+            yield block[offset:offset + ENTRY_SIZE]
+
+
+def build_breach_index(source, output, fmt='hibp', fp_rate=0.01,
+                       chunk_size=BUILD_CHUNK_SIZE, logger=None):
+    """Gera o índice a partir de um dump local com ordenação externa.
+
+    O dump é lido em blocos ordenados gravados em arquivos temporários e
+    intercalados com `heapq.merge`, então a memória fica limitada ao bloco
+    mesmo para centenas de milhões de linhas. O arquivo final é escrito ao
+    lado do destino e trocado atomicamente.
+    """
+    directory = os.path.dirname(os.path.abspath(output))
+    runs = []
+    chunk = array('Q')
+    for value in _read_prefixes(source, fmt):
+        chunk.append(value)
+        if len(chunk) >= chunk_size:
+            runs.append(_write_run(chunk, directory))
+            chunk = array('Q')
+            if logger:
+                logger.info("Bloco %d ordenado", len(runs))
+    if chunk or not runs:
+        runs.append(_write_run(chunk, directory))
+
+    fanout = [0] * 65537
+    entries = 0
+    tmp_output = output + '.tmp'
+    with open(tmp_output, 'wb') as out:
+        out.write(b'\0' * TABLE_OFFSET)
+        previous = None
+        for prefix in heapq.merge(*(_iter_run(run) for run in runs)):
+            if prefix == previous:
+                continue
+            out.write(prefix)
+            fanout[int.from_bytes(prefix[:2], 'big') + 1] += 1
+            previous = prefix
+            entries += 1
+        for run in runs:
+            run.close()
+
+        for bucket in range(1, 65537):
+            fanout[bucket] += fanout[bucket - 1]
+
+        # Dimensionamento clássico: m = -n ln p / (ln 2)^2, k = m/n ln 2
+        bloom_bits = max(64, int(math.ceil(-max(entries, 1) * math.log(fp_rate) / math.log(2) ** 2)))
+        bloom_hashes = min(16, max(1, int(round(bloom_bits / max(entries, 1) * math.log(2)))))
+        bloom = bytearray((bloom_bits + 7) // 8)
+        out.flush()
+        with open(tmp_output, 'rb') as table:
+            table.seek(TABLE_OFFSET)
+            for prefix in _iter_run(table):
+                for bit in _bloom_positions(prefix, bloom_bits, bloom_hashes):
+                    bloom[bit >> 3] |= 1 << (bit & 7)
+
+        bloom_offset = TABLE_OFFSET + entries * ENTRY_SIZE
+        out.write(bloom)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, entries, bloom_bits, bloom_offset, bloom_hashes))
+        out.write(FANOUT.pack(*fanout))
+
+    os.replace(tmp_output, output)
+    return {'entries': entries, 'bloom_bytes': len(bloom), 'bloom_hashes': bloom_hashes,
+            'size': os.path.getsize(output)}
+
+
+breach_index = BreachIndex()
+
+
+def find_breached(passwords):
+    """Índices das senhas presentes no índice de vazamentos"""
+    return [i for i, found in enumerate(breach_index.contains_many(passwords)) if found]
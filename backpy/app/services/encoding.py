@@ -0,0 +1,160 @@
+import json
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional: sem ela fica o json da biblioteca padrão
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNS_MIMETYPE = 'application/vnd.senhas.columns+json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Respostas sem corpo ou parciais nunca são comprimidas
+SKIP_STATUS = (204, 206, 304)
+
+
+def dumps(value):
+    """Serialização rápida (orjson quando instalado) devolvendo texto"""
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, separators=(',', ':'))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provedor JSON do Flask apoiado no orjson (ordem de chaves preservada, sem indentação)"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default),
+                                        mimetype=self.mimetype)
+
+
+def negotiate_format():
+    """'json', 'columns' ou 'msgpack', conforme o cabeçalho Accept"""
+    offers = [JSON_MIMETYPE, COLUMNS_MIMETYPE]
+    if msgpack is not None:
+        offers.extend(MSGPACK_MIMETYPES)
+    best = request.accept_mimetypes.best_match(offers, default=JSON_MIMETYPE)
+    if best == COLUMNS_MIMETYPE:
+        return 'columns'
+    if best in MSGPACK_MIMETYPES:
+        return 'msgpack'
+    return 'json'
+
+
+def negotiate_encoding():
+    """'zstd', 'gzip' ou None, conforme o cabeçalho Accept-Encoding"""
+    offers = ['gzip']
+    if zstandard is not None:
+        offers.insert(0, 'zstd')
+    return request.accept_encodings.best_match(offers)
+
+
+def epoch(value):
+    """Timestamp em segundos (inteiro) no lugar da data ISO, para os formatos compactos"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def to_columns(entries, fields):
+    """Lista de objetos -> um vetor por campo, sem repetir as chaves a cada linha"""
+    return {field: [entry.get(field) for entry in entries] for field in fields}
+
+
+def encoded_response(payload, status=200, fmt='json'):
+    """Resposta no formato negociado; JSON passa pelo provedor do app"""
+    if fmt == 'msgpack':
+        body = msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+        response = Response(body, status=status, mimetype=MSGPACK_MIMETYPES[0])
+    elif fmt == 'columns':
+        response = Response(current_app.json.dumps(payload), status=status, mimetype=COLUMNS_MIMETYPE)
+    else:
+        response = current_app.json.response(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
+
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return epoch(value)
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+
+def _compressor(encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=current_app.config['ZSTD_LEVEL']).compressobj()
+    # wbits 16 + MAX_WBITS gera o cabeçalho gzip
+    return zlib.compressobj(current_app.config['GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Fecha o gerador original (e o contexto do streaming) se o cliente desconectar
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """Comprime a resposta (gzip/zstd) se o cliente aceitar e o corpo passar do limite.
+
+    Respostas em streaming são comprimidas incrementalmente, sem montar o corpo.
+    """
+    response.vary.add('Accept-Encoding')
+    if (response.status_code in SKIP_STATUS or response.status_code >= 400
+            or 'Content-Encoding' in response.headers or response.direct_passthrough):
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, _compressor(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config['COMPRESSION_MIN_SIZE']:
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(body) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
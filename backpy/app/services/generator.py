@@ -0,0 +1,155 @@
+import os
+import threading
+from array import array
+
+from app.services.policy import NUMBER_CHARS
+
+
+class RandomBuffer:
+    """Bytes aleatórios do SO lidos em blocos, consumidos com amostragem por rejeição"""
+
+    def __init__(self, buffer_size=8192):
+        self.buffer_size = buffer_size
+        self._buffer = b''
+        self._offset = 0
+
+    def _take(self, count):
+        available = len(self._buffer) - self._offset
+        if available < count:
+            refill = max(self.buffer_size, count - available)
+            self._buffer = self._buffer[self._offset:] + os.urandom(refill)
+            self._offset = 0
+        chunk = self._buffer[self._offset:self._offset + count]
+        self._offset += count
+        return chunk
+
+    def indices(self, bound, count):
+        """Retorna `count` inteiros uniformes em [0, bound) sem viés de módulo"""
+        if bound > 65536:
+            return [self.below(bound) for _ in range(count)]
+
+        # Limites de até 2**16 (listas de palavras) sorteiam 2 bytes por valor
+        width = 1 if bound <= 256 else 2
+        space = 256 ** width
+        limit = space - (space % bound)
+        result = []
+        while len(result) < count:
+            missing = count - len(result)
+            # Pede um pouco mais do que falta para compensar os valores rejeitados
+            wanted = missing + missing * (space - limit) // limit + 1
+            chunk = self._take(wanted * width)
+            values = chunk if width == 1 else array('H', chunk)
+            result.extend(v % bound for v in values if v < limit)
+        del result[count:]
+        return result
+
+    def below(self, bound):
+        """Um inteiro uniforme em [0, bound), para limites de até 2**32"""
+        if bound <= 256:
+            limit = 256 - (256 % bound)
+            while True:
+                value = self._take(1)[0]
+                if value < limit:
+                    return value % bound
+        width = (bound - 1).bit_length()
+        nbytes = (width + 7) // 8
+        mask = (1 << width) - 1
+        while True:
+            value = int.from_bytes(self._take(nbytes), 'big') & mask
+            if value < bound:
+                return value
+
+    def shuffle(self, items):
+        """Fisher-Yates com índices do buffer"""
+        if len(items) > 256:
+            for i in range(len(items) - 1, 0, -1):
+                j = self.below(i + 1)
+                items[i], items[j] = items[j], items[i]
+            return
+
+        # Limites de até 256: um byte por troca lido direto do buffer, sem fatiar
+        buffer = self._buffer
+        offset = self._offset
+        for i in range(len(items) - 1, 0, -1):
+            bound = i + 1
+            limit = 256 - (256 % bound)
+            while True:
+                if offset >= len(buffer):
+                    self._buffer = buffer = os.urandom(self.buffer_size)
+                    offset = 0
+                value = buffer[offset]
+                offset += 1
+                if value < limit:
+                    break
+            j = value % bound
+            items[i], items[j] = items[j], items[i]
+        self._offset = offset
+
+
+class PasswordEngine:
+    """Gera senhas em lote a partir de um buffer de bytes do CSPRNG"""
+
+    def __init__(self, buffer_size=8192):
+        self._local = threading.local()
+        self.buffer_size = buffer_size
+
+    @property
+    def random(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = RandomBuffer(self.buffer_size)
+        return buffer
+
+    def _after_fork(self):
+        # O filho herdaria os bytes ainda não consumidos do pai e repetiria as mesmas senhas
+        self._local = threading.local()
+
+    def generate_policy_batch(self, count, policy):
+        """Uma passada por senha: os mínimos de cada classe e o restante do alfabeto,
+        embaralhados juntos, sem sorteios repetidos nem posições sobrescritas"""
+        alphabet = policy.alphabet
+        required = [(chars, minimum) for _, chars, minimum in policy.classes if minimum]
+        filler = policy.length - policy.required
+
+        rng = self.random
+        # Sorteia de uma vez todos os caracteres livres e obrigatórios do lote
+        pool_indices = rng.indices(len(alphabet), filler * count)
+        required_chars = [(minimum, [chars[i] for i in rng.indices(len(chars), minimum * count)])
+                          for chars, minimum in required]
+
+        passwords = []
+        for n in range(count):
+            start = n * filler
+            chars = [alphabet[i] for i in pool_indices[start:start + filler]]
+            for minimum, class_chars in required_chars:
+                chars.extend(class_chars[n * minimum:(n + 1) * minimum])
+            if required:
+                rng.shuffle(chars)
+            passwords.append(''.join(chars))
+        return passwords
+
+    def generate_passphrase_batch(self, count, wordlist, words=6, separator='-',
+                                  capitalize=False, include_number=False):
+        """Frases Diceware: `words` palavras sorteadas da lista, sem viés"""
+        rng = self.random
+        # Todos os índices do lote saem de uma vez do buffer
+        word_indices = rng.indices(len(wordlist), count * words)
+        if include_number:
+            positions = rng.indices(words, count)
+            digits = rng.indices(10, count)
+
+        phrases = []
+        for n in range(count):
+            chosen = wordlist.words(word_indices[n * words:(n + 1) * words])
+            if capitalize:
+                chosen = [word.capitalize() for word in chosen]
+            if include_number:
+                # Um dígito anexado a uma palavra sorteada
+                chosen[positions[n]] += NUMBER_CHARS[digits[n]]
+            phrases.append(separator.join(chosen))
+        return phrases
+
+
+engine = PasswordEngine()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=engine._after_fork)
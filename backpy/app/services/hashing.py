@@ -0,0 +1,158 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.services.metrics import metrics
+
+
+def _method_prefix(method):
+    """Prefixo dos hashes gerados com `method`, na forma expandida"""
+    # O Werkzeug completa os parâmetros omitidos ('scrypt' -> 'scrypt:32768:8:1')
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+class HashingPoolBusy(Exception):
+    """A fila de hashing está cheia (ou demorou demais); a requisição deve receber 503"""
+
+
+class HashingPool:
+    """Executa o KDF das senhas de login fora da thread da requisição.
+
+    Usa um pool de processos (fora do GIL) com limite de tarefas pendentes:
+    quando o limite é atingido a chamada falha na hora em vez de enfileirar.
+    Com workers=0 o hash roda na própria thread (útil em testes e scripts).
+    """
+
+    def __init__(self, workers=0, max_pending=32, method='scrypt:32768:8:1', timeout=30):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self.timeout = timeout
+        self._method_prefix = None
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'pending': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'failures': 0,
+                       'total_latency': 0.0, 'max_latency': 0.0}
+
+    def configure(self, workers, max_pending, method, timeout=30):
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Calculado já aqui: um HASH_METHOD inválido falha na inicialização
+        self._method_prefix = _method_prefix(method)
+
+    def hash(self, password):
+        return self._run('password_hash', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run('password_verify', check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # O prefixo do hash do Werkzeug guarda o método e os parâmetros usados
+        if self._method_prefix is None:
+            self._method_prefix = _method_prefix(self.method)
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def _run(self, operation, fn, *args):
+        # A referência local sobrevive a um configure() no meio da chamada
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingPoolBusy()
+
+        started = time.perf_counter()
+        with self._lock:
+            self._stats['pending'] += 1
+        if self.workers <= 0:
+            try:
+                result = fn(*args)
+            finally:
+                self._release(slots)
+            self._record(operation, started)
+            return result
+
+        try:
+            executor, future = self._submit(fn, *args)
+        except BaseException:
+            self._release(slots)
+            raise
+        # O slot só volta quando o processo larga a tarefa: cancel() não
+        # interrompe um hash em execução, e o limite vale para o pool, não para a espera
+        future.add_done_callback(lambda _: self._release(slots))
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise HashingPoolBusy()
+        except BrokenProcessPool:
+            # Um worker morreu (OOM, sinal): o pool é descartado e recriado na próxima chamada
+            self._discard_executor(executor)
+            with self._lock:
+                self._stats['failures'] += 1
+            raise HashingPoolBusy()
+        self._record(operation, started)
+        return result
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Quebrado por uma tarefa anterior: recria uma vez e tenta de novo
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(fn, *args)
+
+    def _release(self, slots):
+        with self._lock:
+            self._stats['pending'] -= 1
+        slots.release()
+
+    def _record(self, operation, started):
+        # Só as tarefas concluídas; inclui o tempo de espera na fila do pool
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['total_latency'] += elapsed
+            self._stats['max_latency'] = max(self._stats['max_latency'], elapsed)
+        metrics.observe('hot_path_duration_seconds', elapsed, (('operation', operation),))
+
+    def _get_executor(self):
+        # Criado sob demanda para que cada worker WSGI (após o fork) tenha o seu
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, max_pending=self.max_pending, workers=self.workers)
+
+
+hashing_pool = HashingPool()
+atexit.register(hashing_pool.shutdown)
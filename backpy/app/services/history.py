@@ -0,0 +1,191 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+from app import db
+from app.models.history import GenerationEvent
+from app.services.encoding import dumps
+from app.services.keyring import get_keyring
+
+logger = logging.getLogger(__name__)
+
+PRUNE_CHUNK_SIZE = 1000
+
+
+class HistoryWriter:
+    """Fila write-behind do histórico de gerações.
+
+    `record` só enfileira o evento, sem tocar no banco; uma thread grava a fila
+    em INSERTs em lote quando ela chega a `batch_size` ou a cada
+    `flush_interval` segundos, e o que sobrar é gravado no encerramento do
+    processo. Com a fila cheia o evento é descartado: o histórico nunca segura
+    a geração de senhas.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.batch_size = 100
+        self.flush_interval = 1.0
+        self.max_queue = 10000
+        self.retention_days = 0
+        self.prune_interval = 3600
+        self._app = None
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._queue = []
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._last_prune = None
+        self._stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'pruned': 0}
+
+    def configure(self, app, enabled, batch_size, flush_interval, max_queue,
+                  retention_days=0, prune_interval=3600):
+        self.shutdown()
+        self._app = app
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        # O shutdown acima deixa o evento ligado; a próxima thread esperaria zero segundos
+        self._wakeup.clear()
+        self._stopping = False
+
+    def record(self, user_id, mode, settings, count=1, password=None):
+        """Enfileira uma geração; a senha, se enviada, é cifrada só na gravação"""
+        if not self.enabled:
+            return False
+        event = {
+            'user_id': user_id,
+            'created_at': datetime.utcnow(),
+            'mode': mode,
+            'count': count,
+            'policy': settings,
+            'password': password,
+        }
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._stats['dropped'] += 1
+                return False
+            self._queue.append(event)
+            self._stats['recorded'] += 1
+            full = len(self._queue) >= self.batch_size
+            self._ensure_thread()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _ensure_thread(self):
+        # Criada sob demanda para que cada worker WSGI (após o fork) tenha a sua
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            self._maybe_prune()
+
+    def flush(self):
+        """Grava a fila em lotes de `batch_size`; retorna quantos eventos foram gravados"""
+        written = 0
+        while True:
+            with self._lock:
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Histórico é melhor esforço: o lote com erro é descartado e registrado
+                logger.error("Erro ao gravar %d eventos do histórico: %s", len(batch), e)
+                with self._lock:
+                    self._stats['failed'] += len(batch)
+                continue
+            written += len(batch)
+            with self._lock:
+                self._stats['written'] += len(batch)
+
+    def _write(self, batch):
+        with self._app.app_context():
+            keyring = get_keyring()
+            rows = [dict(
+                event,
+                policy=dumps(event['policy']),
+                password=keyring.encrypt(event['password']) if event['password'] is not None else None,
+            ) for event in batch]
+            try:
+                db.session.execute(insert(GenerationEvent), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if self.retention_days <= 0 or (self._last_prune is not None
+                                        and now - self._last_prune < self.prune_interval):
+            return
+        self._last_prune = now
+        try:
+            with self._app.app_context():
+                removed = prune_history(self.retention_days)
+        except Exception as e:
+            logger.error("Erro ao podar o histórico: %s", e)
+            return
+        with self._lock:
+            self._stats['pruned'] += removed
+
+    def shutdown(self, timeout=5):
+        """Para a thread e grava o que ainda estiver na fila"""
+        self._stopping = True
+        self._wakeup.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        if self._app is not None:
+            self.flush()
+
+    def _after_fork(self):
+        # O processo filho não herda a thread; a fila copiada seria gravada em dobro
+        self._reset()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queued=len(self._queue))
+
+
+def prune_history(retention_days, chunk_size=PRUNE_CHUNK_SIZE):
+    """Apaga em lotes os eventos mais antigos que `retention_days`; retorna quantos"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = [row_id for row_id, in db.session.query(GenerationEvent.id)
+               .filter(GenerationEvent.created_at < cutoff)
+               .limit(chunk_size)]
+        if not ids:
+            break
+        db.session.execute(delete(GenerationEvent).where(GenerationEvent.id.in_(ids)))
+        db.session.commit()
+        removed += len(ids)
+        if len(ids) < chunk_size:
+            break
+    return removed
+
+
+history_writer = HistoryWriter()
+atexit.register(history_writer.shutdown)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=history_writer._after_fork)
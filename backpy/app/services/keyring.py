@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import itertools
+import re
+import threading
+
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from app.services.metrics import metrics
+
+KDF_SALT = b'password-manager-salt'  # This should ideally be stored securely
+KDF_ITERATIONS = 100000
+
+# Token Fernet: base64 urlsafe começando pelo byte de versão 0x80 ("gAAAAA")
+# e com no mínimo 73 bytes decodificados (versão, timestamp, IV, 1 bloco, HMAC)
+_FERNET_TOKEN_RE = re.compile(r'^gAAAAA[A-Za-z0-9_-]{92,}={0,2}$')
+
+_lock = threading.Lock()
+_derived_keys = {}
+_keyring = None
+_stats = {'key_derivations': 0}
+# Acertos contados sem lock (next() em itertools.count é atômico sob o GIL).
+# Ler o contador também o avança, então as leituras são descontadas à parte
+_cache_hits = itertools.count()
+_cache_hit_reads = itertools.count()
+
+
+def derive_key(secret_key):
+    """Deriva a chave Fernet de um segredo (PBKDF2 roda uma vez por processo)"""
+    with _lock:
+        key = _derived_keys.get(secret_key)
+    if key is not None:
+        next(_cache_hits)
+        return key
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=KDF_SALT,
+        iterations=KDF_ITERATIONS,
+    )
+    with metrics.timer('hot_path_duration_seconds', operation='key_derivation'):
+        key = base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
+
+    with _lock:
+        _stats['key_derivations'] += 1
+        _derived_keys.setdefault(secret_key, key)
+    return key
+
+
+class KeyRing:
+    """Conjunto de chaves ativas: a atual (cifra) e as aposentadas (só decifram)"""
+
+    def __init__(self, current_secret, retired_secrets=()):
+        self.secrets = (current_secret,) + tuple(retired_secrets)
+        self.keys = [derive_key(secret) for secret in self.secrets]
+        self.current = Fernet(self.keys[0])
+        self.multi = MultiFernet([Fernet(key) for key in self.keys])
+
+    @property
+    def current_key(self):
+        return self.keys[0]
+
+    def encrypt(self, plaintext):
+        with metrics.timer('hot_path_duration_seconds', operation='fernet_encrypt'):
+            return self.current.encrypt(plaintext.encode()).decode()
+
+    def decrypt(self, token):
+        with metrics.timer('hot_path_duration_seconds', operation='fernet_decrypt'):
+            return self.multi.decrypt(token.encode()).decode()
+
+    def decrypt_or_none(self, token):
+        try:
+            return self.decrypt(token)
+        except InvalidToken:
+            return None
+
+    def is_current(self, token):
+        """Indica se o token já está cifrado com a chave atual"""
+        try:
+            self.current.decrypt(token.encode())
+            return True
+        except InvalidToken:
+            return False
+
+    def rotate(self, token):
+        """Recifra o token com a chave atual, preservando o timestamp original"""
+        return self.multi.rotate(token.encode()).decode()
+
+
+def is_fernet_token(value):
+    """Distingue token Fernet de texto simples sem tentar decifrar"""
+    return bool(value) and len(value) % 4 == 0 and _FERNET_TOKEN_RE.match(value) is not None
+
+
+def configure_keyring(current_secret, retired_secrets=()):
+    """Monta o key ring do processo; o create_app chama com os segredos do app.config"""
+    global _keyring
+    _keyring = KeyRing(current_secret, tuple(retired_secrets))
+    return _keyring
+
+
+def get_keyring():
+    """Retorna o key ring montado pelo create_app (sem lock nem leitura do ambiente)"""
+    if _keyring is None:
+        raise RuntimeError('Key ring não configurado: crie o app com create_app()')
+    next(_cache_hits)
+    return _keyring
+
+
+def keyring_stats():
+    with _lock:
+        cache_hits = next(_cache_hits) - next(_cache_hit_reads)
+        return dict(_stats, cache_hits=cache_hits, cached_keys=len(_derived_keys))
+
+
+def reencrypt_saved_passwords(chunk_size=500, restart=False, logger=None):
+    """Move as linhas de SavedPassword para a chave atual, em lotes por id.
+
+    Cada lote é confirmado junto com um checkpoint próprio da chave de
+    destino: uma execução interrompida continua do último lote, e uma nova
+    SECRET_KEY recomeça do início.
+    """
+    from app import db
+    from app.models.checkpoint import MigrationCheckpoint
+    from app.models.user import SavedPassword
+
+    keyring = get_keyring()
+    checkpoint = MigrationCheckpoint.load(rotation_checkpoint_name(keyring))
+    if restart:
+        checkpoint.last_id = 0
+    db.session.commit()
+
+    rotated = 0
+    skipped = 0
+    while True:
+        rows = (SavedPassword.active()
+                .filter(SavedPassword.id > checkpoint.last_id)
+                .order_by(SavedPassword.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            break
+
+        for row in rows:
+            if keyring.is_current(row.password):
+                continue
+            try:
+                row.password = keyring.rotate(row.password)
+                rotated += 1
+            except InvalidToken:
+                # Token de chave desconhecida ou texto simples: fica para a migração
+                skipped += 1
+
+        checkpoint.last_id = rows[-1].id
+        db.session.commit()
+        if logger:
+            logger.info("Recifragem: até id %s (%s recifradas)", checkpoint.last_id, rotated)
+
+    return {'rotated': rotated, 'skipped': skipped, 'last_id': checkpoint.last_id}
+
+
+def rotation_checkpoint_name(keyring):
+    # Identifica a chave de destino pela chave derivada, sem expor o segredo
+    return 'rotate-keys:' + hashlib.sha256(keyring.current_key).hexdigest()[:16]
@@ -0,0 +1,196 @@
+import bisect
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started, self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histogramas de latência e coletores de contadores, exportados no formato do Prometheus.
+
+    Desabilitado, `timer()` devolve sempre o mesmo objeto sem efeito e
+    `observe()` retorna na primeira linha.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def configure(self, enabled):
+        self.enabled = enabled
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def observe(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(DEFAULT_BUCKETS)
+            histogram.observe(value)
+
+    def register_collector(self, collector):
+        """`collector()` retorna uma lista de (nome, tipo, valor) lida na hora da exportação"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            snapshot = sorted(
+                (name, labels, list(h.counts), h.total, h.count)
+                for (name, labels), h in self._histograms.items()
+            )
+
+        current = None
+        for name, labels, counts, total, count in snapshot:
+            if name != current:
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                current = name
+            cumulative = 0
+            for bound, bucket_count in zip(DEFAULT_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+
+        for collector in self._collectors:
+            for name, kind, value in collector():
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    body = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for key, value in items)
+    return '{' + body + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def instrument_app(app, engine, registry=None):
+    """Liga a medição de latência por rota e o tempo das consultas SQL"""
+    registry = registry or metrics
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        labels = (
+            ('endpoint', request.endpoint or 'desconhecido'),
+            ('method', request.method),
+            ('status', str(response.status_code)),
+        )
+        def observe():
+            registry.observe('http_request_duration_seconds', time.perf_counter() - started, labels)
+
+        if response.is_streamed:
+            # Respostas em streaming só terminam quando o servidor fecha o corpo
+            response.call_on_close(observe)
+        else:
+            observe()
+        return response
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _observe_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_query_started'].pop()
+        registry.observe('hot_path_duration_seconds', time.perf_counter() - started, SQL_LABELS)
+
+    @event.listens_for(engine, 'handle_error')
+    def _discard_query_timer(context):
+        # Consulta com erro não chega ao after_cursor_execute: sem isto a pilha
+        # da conexão cresce a cada falha e desalinha as medições seguintes
+        if context.connection is not None and context.statement is not None:
+            stack = context.connection.info.get('_metrics_query_started')
+            if stack:
+                stack.pop()
+
+
+SQL_LABELS = (('operation', 'sql_query'),)
+
+metrics = MetricsRegistry()
+metrics.describe('http_request_duration_seconds', 'Latência das requisições por rota')
+metrics.describe('hot_path_duration_seconds', 'Latência das operações críticas (KDF, Fernet, hashing, JWT, SQL)')
@@ -0,0 +1,176 @@
+from sqlalchemy import func, inspect, text, update
+
+from app import db
+from app.models.checkpoint import MigrationCheckpoint
+from app.models.user import SavedPassword, User, normalize_name
+from app.services.keyring import get_keyring, is_fernet_token
+from app.services.search import create_search_index
+
+PLAINTEXT_MIGRATION = 'plaintext-to-fernet'
+
+# Colunas acrescentadas depois do schema original, na ordem em que são criadas
+UPGRADE_COLUMNS = (
+    (User, ('vault_version',)),
+    (SavedPassword, ('change_seq', 'deleted_at', 'name_normalized')),
+)
+
+
+def _add_missing_columns(model, names):
+    """ALTER TABLE ADD COLUMN para as colunas do modelo que o banco ainda não tem"""
+    table = model.__table__
+    existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    with db.engine.begin() as connection:
+        for name in names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            ddl = (f'ALTER TABLE {preparer.format_table(table)} '
+                   f'ADD COLUMN {preparer.format_column(column)} {column.type.compile(db.engine.dialect)}')
+            if column.server_default is not None:
+                ddl += f' DEFAULT {column.server_default.arg}'
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            connection.execute(text(ddl))
+            added.append(f'{table.name}.{name}')
+    return added
+
+
+def upgrade_schema(chunk_size=500, logger=None):
+    """Leva um banco criado com o schema original ao schema atual.
+
+    Cria as tabelas, colunas e índices que faltarem, numera as senhas ainda
+    sem `change_seq` (sequências únicas por usuário, na ordem do id) e
+    acerta a `vault_version` de cada usuário para a maior sequência usada.
+    Cada lote é confirmado junto com a reserva das sequências, então uma
+    execução interrompida ou repetida continua sem duplicar números.
+    """
+    added = []
+    for model, names in UPGRADE_COLUMNS:
+        added.extend(_add_missing_columns(model, names))
+    db.create_all()
+    for model in (User, SavedPassword):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    # Versões abaixo da maior sequência já gravada (alterações feitas fora da API)
+    behind = (db.session.query(User, func.max(SavedPassword.change_seq))
+              .join(SavedPassword, SavedPassword.user_id == User.id)
+              .group_by(User.id)
+              .having(func.max(SavedPassword.change_seq) > User.vault_version)
+              .all())
+    for user, highest in behind:
+        user.vault_version = highest
+    db.session.commit()
+
+    numbered = 0
+    user_ids = [user_id for (user_id,) in (db.session.query(SavedPassword.user_id)
+                                           .filter(SavedPassword.change_seq == 0)
+                                           .distinct())]
+    for user_id in user_ids:
+        user = db.session.get(User, user_id)
+        while True:
+            ids = [row_id for (row_id,) in (db.session.query(SavedPassword.id)
+                                            .filter(SavedPassword.user_id == user_id,
+                                                    SavedPassword.change_seq == 0)
+                                            .order_by(SavedPassword.id)
+                                            .limit(chunk_size))]
+            if not ids:
+                break
+            first_seq = user.reserve_change_seqs(len(ids))
+            db.session.execute(update(SavedPassword), [
+                {'id': row_id, 'change_seq': first_seq + n} for n, row_id in enumerate(ids)
+            ])
+            db.session.commit()
+            numbered += len(ids)
+            if logger:
+                logger.info("Sequências: usuário %s até id %s (%s numeradas)", user_id, ids[-1], numbered)
+
+    names = backfill_name_index(chunk_size, logger)
+    return {'columns': added, 'numbered': numbered, 'versions': len(behind), 'names': names['updated']}
+
+
+def migrate_plaintext_passwords(chunk_size=500, restart=False, logger=None):
+    """Cifra as senhas legadas em texto simples, em lotes por chave primária.
+
+    Cada lote é gravado junto com o checkpoint e com novas sequências de
+    alteração para as linhas cifradas, na mesma transação: os clientes que
+    receberam essas senhas como nulas as buscam de novo pelo feed e pelo ETag.
+    Uma execução interrompida continua do último lote confirmado. Como as
+    senhas em texto simples vêm de bancos antigos, o schema é atualizado antes.
+    """
+    upgrade_schema(chunk_size, logger)
+    keyring = get_keyring()
+    checkpoint = MigrationCheckpoint.load(PLAINTEXT_MIGRATION)
+    if restart:
+        checkpoint.last_id = 0
+    db.session.commit()
+
+    scanned = 0
+    migrated = 0
+    while True:
+        rows = (SavedPassword.active()
+                .filter(SavedPassword.id > checkpoint.last_id)
+                .order_by(SavedPassword.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            break
+
+        by_user = {}
+        for row in rows:
+            if not is_fernet_token(row.password):
+                row.password = keyring.encrypt(row.password)
+                by_user.setdefault(row.user_id, []).append(row)
+        for user_id, changed in by_user.items():
+            first_seq = db.session.get(User, user_id).reserve_change_seqs(len(changed))
+            for n, row in enumerate(changed):
+                row.change_seq = first_seq + n
+            migrated += len(changed)
+        scanned += len(rows)
+
+        checkpoint.last_id = rows[-1].id
+        db.session.commit()
+        if logger:
+            logger.info("Migração: até id %s (%s cifradas)", checkpoint.last_id, migrated)
+
+    return {'scanned': scanned, 'migrated': migrated, 'last_id': checkpoint.last_id}
+
+
+def backfill_name_index(chunk_size=500, logger=None):
+    """Prepara a busca por nome em um banco criado antes da coluna normalizada.
+
+    Adiciona a coluna e os seus índices (o B-tree do prefixo e, no SQLite,
+    o trigram dos trechos), se faltarem, e preenche os nomes pendentes em
+    lotes; as linhas já preenchidas saem do filtro, então uma execução
+    interrompida simplesmente continua. Os demais índices dependem de
+    colunas que um banco antigo pode não ter e ficam com o `upgrade_schema`.
+    """
+    _add_missing_columns(SavedPassword, ('name_normalized',))
+    name_index, = (index for index in SavedPassword.__table__.indexes
+                   if index.name == 'ix_saved_password_user_name')
+    name_index.create(db.engine, checkfirst=True)
+
+    updated = 0
+    while True:
+        rows = (db.session.query(SavedPassword.id, SavedPassword.name)
+                .filter(SavedPassword.name_normalized.is_(None))
+                .order_by(SavedPassword.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            break
+
+        db.session.execute(update(SavedPassword), [
+            {'id': row_id, 'name_normalized': normalize_name(name)} for row_id, name in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+        if logger:
+            logger.info("Índice de nomes: até id %s (%s preenchidos)", rows[-1][0], updated)
+
+    # Por último: a reconstrução do índice de trechos lê os nomes já preenchidos
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+    return {'updated': updated}
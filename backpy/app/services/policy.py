@@ -0,0 +1,167 @@
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+
+UPPERCASE_CHARS = string.ascii_uppercase
+LOWERCASE_CHARS = string.ascii_lowercase
+NUMBER_CHARS = string.digits
+SYMBOL_CHARS = string.punctuation
+AMBIGUOUS_CHARS = 'O0Il1'
+
+POLICY_CACHE_SIZE = 256
+CLASS_LABELS = {
+    'uppercase': ('letra maiúscula', 'letras maiúsculas'),
+    'lowercase': ('letra minúscula', 'letras minúsculas'),
+    'numbers': ('número', 'números'),
+    'symbols': ('símbolo', 'símbolos'),
+}
+
+
+class PolicyError(ValueError):
+    """Opções de política inconsistentes; a requisição deve receber 400"""
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Política compilada: imutável, comparável e usada como chave de cache.
+
+    `classes` guarda (nome, caracteres, mínimo) de cada conjunto incluído,
+    `alphabet` a união deles e `masks` o bit da classe de cada caractere,
+    tudo calculado uma única vez em `compile_policy`.
+    """
+    length: int
+    classes: tuple
+    alphabet: str
+    masks: tuple
+
+    @property
+    def required(self):
+        return sum(minimum for _, _, minimum in self.classes)
+
+    def summary(self):
+        """Descrição compacta da política (tamanho, mínimos por classe, tamanho do alfabeto)"""
+        return {
+            'length': self.length,
+            'classes': {name: minimum for name, _, minimum in self.classes},
+            'alphabet_size': len(self.alphabet),
+        }
+
+    def violations(self, password):
+        """Mensagens das regras que a senha não cumpre (lista vazia se estiver de acordo)"""
+        masks = dict(self.masks)
+        counts = [0] * len(self.classes)
+        outside = set()
+        for char in password:
+            mask = masks.get(char)
+            if mask is None:
+                outside.add(char)
+                continue
+            for index in range(len(self.classes)):
+                if mask >> index & 1:
+                    counts[index] += 1
+
+        problems = []
+        if len(password) < self.length:
+            problems.append(f'A senha deve ter pelo menos {self.length} caracteres')
+        for (name, _, minimum), count in zip(self.classes, counts):
+            if count < minimum:
+                label = CLASS_LABELS[name][minimum > 1]
+                problems.append(f'A senha deve ter pelo menos {minimum} {label}')
+        if outside:
+            problems.append('A senha tem caracteres não permitidos: ' + ''.join(sorted(outside)))
+        return problems
+
+
+# typed: True == 1 == 1.0 teriam a mesma chave, e a validação de tipos abaixo
+# passaria a depender do que já está no cache
+@lru_cache(maxsize=POLICY_CACHE_SIZE, typed=True)
+def compile_policy(length=12, include_uppercase=True, include_lowercase=True,
+                   include_numbers=True, include_symbols=True, min_uppercase=None,
+                   min_lowercase=None, min_numbers=None, min_symbols=None,
+                   exclude_ambiguous=False, symbols=None):
+    """Transforma as opções do pedido em uma `PasswordPolicy`, memoizada por opções"""
+    if not isinstance(length, int) or isinstance(length, bool) or length < 1:
+        raise PolicyError('length deve ser um inteiro positivo')
+    if symbols is not None:
+        if not isinstance(symbols, str) or not symbols:
+            raise PolicyError('symbols deve ser um texto não vazio')
+        if any(char.isspace() or char.isalnum() or not char.isprintable() for char in symbols):
+            raise PolicyError('symbols só aceita sinais de pontuação visíveis')
+
+    selected = (
+        ('uppercase', include_uppercase, UPPERCASE_CHARS, min_uppercase),
+        ('lowercase', include_lowercase, LOWERCASE_CHARS, min_lowercase),
+        ('numbers', include_numbers, NUMBER_CHARS, min_numbers),
+        ('symbols', include_symbols, symbols or SYMBOL_CHARS, min_symbols),
+    )
+
+    classes = []
+    explicit = False
+    for name, included, chars, minimum in selected:
+        if not included:
+            if minimum:
+                raise PolicyError(f'min_{name} exige include_{name}')
+            continue
+        # Sem repetições: um caractere repetido teria mais chance de ser sorteado
+        chars = ''.join(dict.fromkeys(chars))
+        if exclude_ambiguous:
+            chars = ''.join(char for char in chars if char not in AMBIGUOUS_CHARS)
+        if not chars:
+            raise PolicyError(f'O conjunto {name} ficou vazio')
+        if minimum is None:
+            minimum = 1
+        elif not isinstance(minimum, int) or isinstance(minimum, bool) or minimum < 0:
+            raise PolicyError(f'min_{name} deve ser um inteiro não negativo')
+        else:
+            explicit = True
+        classes.append((name, chars, minimum))
+
+    # If no character sets were selected, default to lowercase
+    if not classes:
+        chars = LOWERCASE_CHARS
+        if exclude_ambiguous:
+            chars = ''.join(char for char in chars if char not in AMBIGUOUS_CHARS)
+        classes.append(('lowercase', chars, 1))
+
+    if sum(minimum for _, _, minimum in classes) > length:
+        if explicit:
+            raise PolicyError('A soma dos mínimos por classe passa do tamanho da senha')
+        # Senhas curtas demais não comportam um caractere de cada conjunto
+        classes = [(name, chars, 0) for name, chars, _ in classes]
+
+    masks = {}
+    for index, (_, chars, _) in enumerate(classes):
+        for char in chars:
+            masks[char] = masks.get(char, 0) | 1 << index
+    alphabet = ''.join(masks)
+
+    return PasswordPolicy(length=length, classes=tuple(classes), alphabet=alphabet,
+                          masks=tuple(masks.items()))
+
+
+POLICY_FIELDS = ('length', 'include_uppercase', 'include_lowercase', 'include_numbers',
+                 'include_symbols', 'min_uppercase', 'min_lowercase', 'min_numbers',
+                 'min_symbols', 'exclude_ambiguous', 'symbols')
+BOOLEAN_FIELDS = ('include_uppercase', 'include_lowercase', 'include_numbers',
+                  'include_symbols', 'exclude_ambiguous')
+
+
+def policy_from_options(data, default_length=12):
+    """Compila a política a partir do JSON do pedido (chaves ausentes usam o padrão)"""
+    if not isinstance(data, dict):
+        raise PolicyError('policy deve ser um objeto')
+    options = {field: data[field] for field in POLICY_FIELDS if field in data}
+    options.setdefault('length', default_length)
+    for field in BOOLEAN_FIELDS:
+        if field in options:
+            options[field] = bool(options[field])
+    try:
+        return compile_policy(**options)
+    except TypeError:
+        # Valores não hasheáveis (listas, objetos) não chegam a ser opções válidas
+        raise PolicyError('Opções de política inválidas')
+
+
+def policy_cache_stats():
+    info = compile_policy.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
@@ -0,0 +1,221 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+
+from app.services.auth_cache import principal_cache
+
+try:
+    import redis
+except ImportError:  # Dependência opcional: só o backend compartilhado precisa dela
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(value):
+    """'10/minute' (ou '10/60') -> (fichas por segundo, capacidade do balde)"""
+    try:
+        count, period = value.split('/', 1)
+        count = int(count)
+        seconds = PERIODS[period] if period in PERIODS else int(period)
+    except (AttributeError, KeyError, ValueError):
+        raise ValueError(f'Limite inválido: {value!r} (use, por exemplo, 10/minute)')
+    if count < 1 or seconds < 1:
+        raise ValueError(f'Limite inválido: {value!r}')
+    return count / seconds, count
+
+
+class _Shard:
+    __slots__ = ('lock', 'buckets', 'evictions')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+        self.evictions = 0
+
+
+class MemoryBackend:
+    """Baldes de fichas no processo, divididos em shards com lock próprio.
+
+    O reabastecimento é preguiçoso: cada balde guarda só (fichas, instante) e
+    é atualizado quando consultado. Cada shard é um LRU limitado; a chave mais
+    ociosa sai primeiro e, se voltar, recomeça com o balde cheio.
+    """
+
+    def __init__(self, shards=16, max_keys=100_000):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self.max_keys_per_shard = max(1, max_keys // len(self._shards))
+
+    def hit(self, key, rate, burst, cost=1):
+        """(permitido, segundos até haver fichas suficientes)"""
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens, last = bucket
+                tokens = min(burst, tokens + (now - last) * rate)
+                shard.buckets.move_to_end(key)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            shard.buckets[key] = (tokens, now)
+            if len(shard.buckets) > self.max_keys_per_shard:
+                shard.buckets.popitem(last=False)
+                shard.evictions += 1
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def stats(self):
+        keys = evictions = 0
+        for shard in self._shards:
+            with shard.lock:
+                keys += len(shard.buckets)
+                evictions += shard.evictions
+        return {'keys': keys, 'evictions': evictions}
+
+
+# Mesmo algoritmo do MemoryBackend, executado de forma atômica no Redis
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 't', 'l')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'l', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Baldes compartilhados entre processos e servidores.
+
+    Cada balde é um hash que expira quando o balde enche de novo, então chaves
+    ociosas somem sozinhas. Com o Redis fora do ar a requisição é permitida:
+    o limite é uma proteção, não uma dependência da API.
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_BACKEND com redis:// exige o pacote redis')
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+        self.errors = 0
+
+    def hit(self, key, rate, burst, cost=1):
+        try:
+            allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, burst, cost, time.time()])
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning("Backend de rate limit indisponível: %s", e)
+            return True, 0.0
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+    def stats(self):
+        return {'errors': self.errors}
+
+
+def backend_from_url(url, shards=16, max_keys=100_000):
+    """`memory://` (padrão, por processo) ou `redis://...` (compartilhado)"""
+    if not url or url.startswith('memory://'):
+        return MemoryBackend(shards, max_keys)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'RATE_LIMIT_BACKEND desconhecido: {url}')
+
+
+class RateLimiter:
+    """Regras nomeadas ('login', 'vault_read'...) aplicadas às rotas com `rate_limit`"""
+
+    def __init__(self):
+        self.enabled = False
+        self.rules = {}
+        self.backend = MemoryBackend()
+        self._lock = threading.Lock()
+        self.rejected = {}
+
+    def configure(self, enabled, rules, backend=None):
+        self.enabled = enabled
+        self.rules = {name: parse_limit(value) for name, value in rules.items() if value}
+        self.backend = backend or MemoryBackend()
+        with self._lock:
+            self.rejected = {}
+
+    def check(self, rule, keys):
+        """None se a requisição pode seguir; senão, segundos até a próxima ficha"""
+        rate, burst = self.rules[rule]
+        for key in keys:
+            # A primeira chave recusada encerra: as demais nem gastam fichas
+            allowed, retry_after = self.backend.hit(f'{rule}:{key}', rate, burst)
+            if not allowed:
+                with self._lock:
+                    self.rejected[rule] = self.rejected.get(rule, 0) + 1
+                return retry_after
+        return None
+
+    def stats(self):
+        with self._lock:
+            rejected = dict(self.rejected)
+        return dict(self.backend.stats(), rejected=rejected)
+
+
+limiter = RateLimiter()
+
+
+def rate_limit(rule, per=('ip',)):
+    """Aplica a regra antes da rota e de qualquer decorador abaixo dele.
+
+    Deve ficar acima de `token_required`: a recusa sai antes da validação do
+    JWT e de qualquer consulta ao banco. A chave `user` vem do cache de
+    autenticação (sem criptografia); um token ainda não visto conta só pelo IP.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if limiter.enabled and rule in limiter.rules:
+                retry_after = limiter.check(rule, _request_keys(per))
+                if retry_after is not None:
+                    return _too_many_requests(retry_after)
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+def _request_keys(per):
+    keys = []
+    if 'ip' in per:
+        keys.append('ip:' + (request.remote_addr or '-'))
+    if 'user' in per:
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            user_id = principal_cache.peek(auth_header.split(' ')[1])
+            if user_id is not None:
+                keys.append(f'user:{user_id}')
+    return keys
+
+
+def _too_many_requests(retry_after):
+    response = jsonify({"message": "Muitas requisições. Tente novamente em instantes"})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
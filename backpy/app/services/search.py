@@ -0,0 +1,81 @@
+import sqlite3
+import weakref
+
+from sqlalchemy import Integer, column, text
+
+SEARCH_TABLE = 'saved_password_fts'
+# O tokenizador trigram indexa trechos de três caracteres; termos menores ficam com o LIKE
+MIN_TERM_LENGTH = 3
+
+# Índice externo sobre saved_password.name_normalized: guarda só os trigramas,
+# e os gatilhos o mantêm em dia com qualquer escrita (ORM, Core em lote ou SQL direto)
+_CREATE_STATEMENTS = (
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        name_normalized, content='saved_password', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON saved_password BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name_normalized) VALUES (new.id, new.name_normalized);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON saved_password BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name_normalized)
+        VALUES ('delete', old.id, old.name_normalized);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name_normalized ON saved_password BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name_normalized)
+        VALUES ('delete', old.id, old.name_normalized);
+        INSERT INTO {SEARCH_TABLE}(rowid, name_normalized) VALUES (new.id, new.name_normalized);
+    END""",
+    # Indexa as linhas que já existiam antes do índice
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+)
+
+# Engine -> o índice existe nesse banco (consultado uma vez por engine)
+_available = weakref.WeakKeyDictionary()
+
+
+def _supported(connection):
+    # trigram chegou no SQLite 3.34; o FTS5 pode ter ficado fora da compilação
+    if connection.dialect.name != 'sqlite' or sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    return bool(connection.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+
+
+def _exists(connection):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': SEARCH_TABLE}
+    ).first() is not None
+
+
+def create_search_index(connection):
+    """Cria o índice de busca por trecho do nome, se o banco suportar e ele ainda não existir"""
+    if not _supported(connection) or _exists(connection):
+        return False
+    for statement in _CREATE_STATEMENTS:
+        connection.execute(text(statement))
+    _available.pop(connection.engine, None)
+    return True
+
+
+def drop_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+        _available.pop(connection.engine, None)
+
+
+def search_index_available(engine):
+    available = _available.get(engine)
+    if available is None:
+        with engine.connect() as connection:
+            available = connection.dialect.name == 'sqlite' and _exists(connection)
+        _available[engine] = available
+    return available
+
+
+def matching_ids(engine, term):
+    """Subconsulta com os ids cujo nome normalizado contém `term`, ou None sem o índice"""
+    if len(term) < MIN_TERM_LENGTH or not search_index_available(engine):
+        return None
+    # Frase entre aspas: os trigramas precisam aparecer em sequência, ou seja, o trecho inteiro
+    phrase = '"' + term.replace('"', '""') + '"'
+    return (text(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :phrase')
+            .bindparams(phrase=phrase)
+            .columns(column('rowid', Integer)))
@@ -0,0 +1,457 @@
+import math
+import os
+import re
+from collections import deque
+from datetime import date
+
+from app.services.breach import breach_index
+from app.services.metrics import metrics
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+DEFAULT_DICTIONARIES = {
+    'passwords': os.path.join(DATA_DIR, 'common_passwords.txt'),
+    'words': os.path.join(DATA_DIR, 'words.txt'),
+}
+
+# Só os primeiros caracteres passam pelos detectores; o resto conta como força bruta
+MAX_ANALYZED_LENGTH = 128
+MIN_WORD_LENGTH = 3
+REFERENCE_YEAR = date.today().year
+MIN_YEAR_SPACE = 20
+
+# Limiares de tentativas do zxcvbn para as notas 0 a 4
+SCORE_THRESHOLDS = (1e3, 1e6, 1e8, 1e10)
+
+LEET = str.maketrans({'4': 'a', '@': 'a', '8': 'b', '3': 'e', '6': 'g', '1': 'i', '!': 'i',
+                      '|': 'l', '0': 'o', '$': 's', '5': 's', '7': 't', '+': 't', '2': 'z'})
+
+# Teclado QWERTY inclinado: (linha sem shift, linha com shift, deslocamento da coluna)
+KEYBOARD_ROWS = (
+    ('`1234567890-=', '~!@#$%^&*()_+', 0),
+    ('qwertyuiop[]\\', 'QWERTYUIOP{}|', 1),
+    ("asdfghjkl;'", 'ASDFGHJKL:"', 1),
+    ('zxcvbnm,./', 'ZXCVBNM<>?', 1),
+)
+KEYBOARD_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (1, -1), (-1, 1), (0, 1))
+
+DATE_SEPARATED = re.compile(r'(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})')
+DATE_SPLITS = {
+    4: ((1, 2), (2, 3)),
+    5: ((1, 3), (2, 3)),
+    6: ((1, 2), (2, 4), (4, 5)),
+    7: ((1, 3), (2, 3), (4, 5), (4, 6)),
+    8: ((2, 4), (4, 6)),
+}
+
+FEEDBACK = {
+    'breach': 'Esta senha aparece em vazamentos conhecidos',
+    'dictionary': 'Evite palavras e senhas comuns',
+    'keyboard': 'Evite sequências de teclas vizinhas no teclado',
+    'repeat': 'Evite repetições como "aaa" ou "abcabc"',
+    'sequence': 'Evite sequências como "abc" ou "6543"',
+    'date': 'Evite datas e anos ligados a você',
+}
+
+
+def _build_keyboard():
+    positions = {}
+    unshift = {}
+    for y, (plain, shift, offset) in enumerate(KEYBOARD_ROWS):
+        for x, (key, shifted_key) in enumerate(zip(plain, shift)):
+            positions[key] = (x + offset, y)
+            unshift[shifted_key] = key
+    grid = {position: key for key, position in positions.items()}
+    adjacency = {}
+    for key, (x, y) in positions.items():
+        adjacency[key] = {grid[(x + dx, y + dy)]: direction
+                          for direction, (dx, dy) in enumerate(KEYBOARD_DIRECTIONS)
+                          if (x + dx, y + dy) in grid}
+    return adjacency, unshift
+
+
+KEYBOARD_ADJACENCY, KEYBOARD_UNSHIFT = _build_keyboard()
+KEYBOARD_STARTS = len(KEYBOARD_ADJACENCY)
+KEYBOARD_DEGREE = sum(len(n) for n in KEYBOARD_ADJACENCY.values()) / len(KEYBOARD_ADJACENCY)
+
+
+class WordAutomaton:
+    """Aho-Corasick sobre os dicionários, montado uma vez na inicialização.
+
+    Uma busca percorre o texto uma única vez e emite todas as palavras que
+    terminam em cada posição: o custo depende do tamanho da senha e do
+    número de ocorrências, não do tamanho dos dicionários.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        # (tamanho, dicionário, ranking) das palavras que terminam no estado
+        self._output = [()]
+        # Próximo estado na cadeia de falhas que tem saída própria
+        self._output_link = [0]
+        self.words = 0
+
+    def add(self, word, dictionary, rank):
+        state = 0
+        for char in word:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._output_link.append(0)
+            state = following
+        if any(d == dictionary for _, d, _ in self._output[state]):
+            return
+        self._output[state] += ((len(word), dictionary, rank),)
+        self.words += 1
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                link = self._fail[following] = self._goto[fail].get(char, 0)
+                self._output_link[following] = link if self._output[link] else self._output_link[link]
+
+    def search(self, text):
+        """(início, fim inclusivo, dicionário, ranking) de cada palavra encontrada"""
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = state
+            while found:
+                for length, dictionary, rank in self._output[found]:
+                    yield end - length + 1, end, dictionary, rank
+                found = self._output_link[found]
+
+
+def load_automaton(paths):
+    """Lê os dicionários (uma palavra por linha, em ordem de frequência)"""
+    automaton = WordAutomaton()
+    for dictionary, path in paths.items():
+        with open(path, encoding='utf-8') as f:
+            rank = 0
+            for line in f:
+                word = line.strip().lower()
+                if len(word) < MIN_WORD_LENGTH:
+                    continue
+                rank += 1
+                automaton.add(word, dictionary, rank)
+    automaton.build()
+    return automaton
+
+
+def _cardinality(text):
+    lower = upper = digit = symbol = other = False
+    for char in text:
+        if 'a' <= char <= 'z':
+            lower = True
+        elif 'A' <= char <= 'Z':
+            upper = True
+        elif '0' <= char <= '9':
+            digit = True
+        elif char.isascii():
+            symbol = True
+        else:
+            other = True
+    return 26 * lower + 26 * upper + 10 * digit + 33 * symbol + 100 * other or 1
+
+
+def _case_variations(token):
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    if not upper:
+        return 1
+    if not lower or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _year_space(year):
+    return max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE)
+
+
+def _normalize_year(year, digits):
+    if digits == 2:
+        return year + (1900 if year > 50 else 2000)
+    return year
+
+
+def _valid_date(parts, lengths):
+    """(dia, mês, ano) plausível a partir de três números, ou None"""
+    for y_index in (2, 0):
+        year = _normalize_year(parts[y_index], lengths[y_index])
+        if lengths[y_index] not in (2, 4) or not 1000 <= year <= 2050:
+            continue
+        a, b = (parts[1], parts[2]) if y_index == 0 else (parts[0], parts[1])
+        for day, month in ((a, b), (b, a)):
+            if 1 <= day <= 31 and 1 <= month <= 12:
+                return day, month, year
+    return None
+
+
+class StrengthEstimator:
+    """Estimativa de tentativas no estilo do zxcvbn, em tempo linear por senha.
+
+    Cada detector (dicionário, teclado, repetição, sequência e data) percorre a
+    senha uma vez; a decomposição de menor custo é escolhida por programação
+    dinâmica sobre as ocorrências, com força bruta cobrindo os intervalos.
+    """
+
+    def __init__(self, automaton=None):
+        self.automaton = automaton
+
+    def configure(self, extra_wordlist=None):
+        paths = dict(DEFAULT_DICTIONARIES)
+        if extra_wordlist:
+            paths['custom'] = extra_wordlist
+        self.automaton = load_automaton(paths)
+
+    def estimate(self, password):
+        return self.estimate_many([password])[0]
+
+    def estimate_many(self, passwords):
+        """Avalia o lote compartilhando o autômato e uma consulta ao índice de vazamentos"""
+        if self.automaton is None:
+            self.configure()
+        passwords = list(passwords)
+        with metrics.timer('hot_path_duration_seconds', operation='strength_estimate'):
+            breached = breach_index.contains_many(passwords)
+            return [self._estimate(password, leaked) for password, leaked in zip(passwords, breached)]
+
+    def _estimate(self, password, breached=False):
+        if breached:
+            return _result(0.0, [{'pattern': 'breach', 'token': ''}])
+
+        analyzed = password[:MAX_ANALYZED_LENGTH]
+        cardinality = _cardinality(password)
+        char_cost = math.log10(cardinality)
+        matches = self._matches(analyzed)
+
+        # Custo mínimo (log10 das tentativas) para cobrir os primeiros i caracteres
+        length = len(analyzed)
+        cost = [0.0] + [math.inf] * length
+        choice = [None] * (length + 1)
+        by_end = [[] for _ in range(length)]
+        for match in matches:
+            by_end[match[1]].append(match)
+        for end in range(length):
+            cost[end + 1] = cost[end] + char_cost
+            for match in by_end[end]:
+                candidate = cost[match[0]] + match[2]
+                if candidate < cost[end + 1]:
+                    cost[end + 1] = candidate
+                    choice[end + 1] = match
+
+        patterns = []
+        position = length
+        while position > 0:
+            match = choice[position]
+            if match is None:
+                position -= 1
+                continue
+            start, end, _, pattern = match
+            patterns.append(dict(pattern, token=analyzed[start:end + 1]))
+            position = start
+        patterns.reverse()
+
+        guesses_log10 = cost[length] + (len(password) - length) * char_cost
+        return _result(guesses_log10, patterns)
+
+    def _matches(self, text):
+        """(início, fim inclusivo, log10 das tentativas, descrição) de cada padrão"""
+        matches = []
+        matches.extend(self._dictionary_matches(text))
+        matches.extend(_keyboard_matches(text))
+        matches.extend(_repeat_matches(text))
+        matches.extend(_sequence_matches(text))
+        matches.extend(_date_matches(text))
+        return matches
+
+    def _dictionary_matches(self, text):
+        lower = text.lower()
+        for start, end, dictionary, rank in self.automaton.search(lower):
+            token = text[start:end + 1]
+            guesses = rank * _case_variations(token)
+            yield start, end, math.log10(guesses), {'pattern': 'dictionary', 'dictionary': dictionary, 'rank': rank}
+
+        unleet = lower.translate(LEET)
+        if unleet != lower:
+            for start, end, dictionary, rank in self.automaton.search(unleet):
+                token = text[start:end + 1]
+                substitutions = sum(1 for a, b in zip(lower[start:end + 1], unleet[start:end + 1]) if a != b)
+                if not substitutions:
+                    continue
+                guesses = rank * _case_variations(token) * 2 ** substitutions
+                yield (start, end, math.log10(guesses),
+                       {'pattern': 'dictionary', 'dictionary': dictionary, 'rank': rank, 'l33t': True})
+
+        reversed_text = lower[::-1]
+        last = len(text) - 1
+        for start, end, dictionary, rank in self.automaton.search(reversed_text):
+            token = reversed_text[start:end + 1]
+            if token == token[::-1]:
+                continue
+            guesses = rank * _case_variations(text[last - end:last - start + 1]) * 2
+            yield (last - end, last - start, math.log10(guesses),
+                   {'pattern': 'dictionary', 'dictionary': dictionary, 'rank': rank, 'reversed': True})
+
+
+def _keyboard_matches(text):
+    # Teclas com shift andam pelas mesmas posições das teclas sem shift
+    keys = [KEYBOARD_UNSHIFT.get(char, char) for char in text]
+    start = 0
+    length = len(text)
+    while start < length - 2:
+        end = start
+        turns = 0
+        direction = None
+        shifted = 1 if text[start] in KEYBOARD_UNSHIFT else 0
+        while end + 1 < length:
+            neighbours = KEYBOARD_ADJACENCY.get(keys[end])
+            following = neighbours.get(keys[end + 1]) if neighbours else None
+            if following is None:
+                break
+            if following != direction:
+                turns += 1
+                direction = following
+            end += 1
+            shifted += text[end] in KEYBOARD_UNSHIFT
+        if end - start >= 2:
+            yield start, end, _keyboard_guesses(end - start + 1, turns, shifted), {'pattern': 'keyboard', 'turns': turns}
+            start = end
+        else:
+            start += 1
+
+
+def _keyboard_guesses(length, turns, shifted):
+    # Fórmula do zxcvbn: caminhos com até `turns` mudanças de direção
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * KEYBOARD_STARTS * KEYBOARD_DEGREE ** j
+    if shifted:
+        unshifted = length - shifted
+        if not unshifted:
+            guesses *= 2
+        else:
+            guesses *= sum(math.comb(length, i) for i in range(1, min(shifted, unshifted) + 1))
+    return math.log10(max(guesses, 1))
+
+
+def _repeat_matches(text):
+    length = len(text)
+    start = 0
+    while start < length:
+        best = None
+        for base_length in range(1, 5):
+            base = text[start:start + base_length]
+            if len(base) < base_length:
+                break
+            repeats = 1
+            while text[start + repeats * base_length:start + (repeats + 1) * base_length] == base:
+                repeats += 1
+            covered = repeats * base_length
+            if repeats >= 2 and covered >= 3 and (best is None or covered > best[1]):
+                best = (base, covered, repeats)
+        if best is None:
+            start += 1
+            continue
+        base, covered, repeats = best
+        base_guesses = len(base) * math.log10(_cardinality(base))
+        yield (start, start + covered - 1, base_guesses + math.log10(repeats),
+               {'pattern': 'repeat', 'base': base, 'repeats': repeats})
+        start += covered
+
+
+def _sequence_class(char):
+    if 'a' <= char <= 'z':
+        return 26
+    if 'A' <= char <= 'Z':
+        return 26
+    if '0' <= char <= '9':
+        return 10
+    return None
+
+
+def _sequence_matches(text):
+    length = len(text)
+    start = 0
+    while start < length - 2:
+        space = _sequence_class(text[start])
+        delta = ord(text[start + 1]) - ord(text[start])
+        if space is None or not 1 <= abs(delta) <= 5 or _sequence_class(text[start + 1]) != space:
+            start += 1
+            continue
+        end = start + 1
+        while (end + 1 < length and _sequence_class(text[end + 1]) == space
+               and ord(text[end + 1]) - ord(text[end]) == delta):
+            end += 1
+        if end - start >= 2:
+            base = 4 if text[start] in 'aAzZ019' else space
+            guesses = base * (end - start + 1) * (2 if delta < 0 else 1) * abs(delta)
+            yield start, end, math.log10(guesses), {'pattern': 'sequence', 'ascending': delta > 0}
+            start = end
+        else:
+            start += 1
+
+
+def _date_matches(text):
+    length = len(text)
+    for start in range(length):
+        for size in range(4, 9):
+            token = text[start:start + size]
+            if len(token) < size or not token.isdigit():
+                break
+            if size == 4 and 1900 <= int(token) <= 2050:
+                yield (start, start + 3, math.log10(_year_space(int(token))),
+                       {'pattern': 'date', 'year': int(token)})
+            for split in DATE_SPLITS[size]:
+                pieces = (token[:split[0]], token[split[0]:split[1]], token[split[1]:])
+                found = _valid_date([int(p) for p in pieces], [len(p) for p in pieces])
+                if found:
+                    guesses = _year_space(found[2]) * 365
+                    yield start, start + size - 1, math.log10(guesses), {'pattern': 'date', 'year': found[2]}
+                    break
+
+    for match in DATE_SEPARATED.finditer(text):
+        pieces = (match.group(1), match.group(3), match.group(4))
+        found = _valid_date([int(p) for p in pieces], [len(p) for p in pieces])
+        if found:
+            guesses = _year_space(found[2]) * 365 * 4
+            yield match.start(), match.end() - 1, math.log10(guesses), {'pattern': 'date', 'year': found[2]}
+
+
+def _result(guesses_log10, patterns):
+    guesses = 10 ** min(guesses_log10, 300)
+    score = sum(1 for threshold in SCORE_THRESHOLDS if guesses >= threshold)
+    feedback = []
+    for pattern in patterns:
+        message = FEEDBACK.get(pattern['pattern'])
+        if message and message not in feedback:
+            feedback.append(message)
+    if score < 3 and not feedback:
+        feedback.append('Use uma senha mais longa, com mais tipos de caractere')
+    return {
+        'score': score,
+        'guesses_log10': round(guesses_log10, 2),
+        'entropy_bits': round(guesses_log10 * math.log2(10), 1),
+        # 10 bilhões de tentativas/s: hash rápido atacado offline
+        'crack_time_offline_seconds': round(guesses / 1e10, 3),
+        'patterns': patterns,
+        'feedback': feedback,
+    }
+
+
+strength_estimator = StrengthEstimator()
@@ -0,0 +1,400 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import bindparam, case, insert, update
+
+from app import db
+from app.models.user import SavedPassword, normalize_name
+from app.services.breach import find_breached
+from app.services.encoding import dumps
+from app.services.keyring import get_keyring
+
+IMPORT_BATCH_SIZE = 500
+NAME_MAX_LENGTH = 100
+MUTATION_OPS = ('create', 'rename', 'update', 'delete')
+
+
+def parse_import_stream(stream, content_type):
+    """Lê as linhas do corpo da requisição sem carregá-lo inteiro.
+
+    Aceita CSV (cabeçalho com `name` e `password`) ou NDJSON (um objeto por
+    linha). Produz dicionários; linhas malformadas viram `None`.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if 'csv' in content_type:
+        for row in csv.DictReader(text):
+            yield row
+        return
+
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield item if isinstance(item, dict) else None
+
+
+def import_passwords(user, rows, batch_size=IMPORT_BATCH_SIZE):
+    """Importa as linhas em lotes: uma consulta de conflitos e uma transação por lote"""
+    result = {'imported': 0, 'conflicts': [], 'errors': []}
+    seen = set()
+    keyring = get_keyring()
+    numbered = enumerate(rows, start=1)
+
+    while True:
+        chunk = list(islice(numbered, batch_size))
+        if not chunk:
+            break
+
+        valid = []
+        for line, row in chunk:
+            if row is None:
+                result['errors'].append({'row': line, 'message': 'Linha malformada'})
+                continue
+            name = row.get('name')
+            password = row.get('password')
+            # JSON e NDJSON aceitam qualquer tipo; números, listas e afins são recusados por linha
+            if not isinstance(name, (str, type(None))) or not isinstance(password, (str, type(None))):
+                result['errors'].append({'row': line, 'message': 'Nome e senha devem ser texto'})
+                continue
+            name = (name or '').strip()
+            if not name or not password:
+                result['errors'].append({'row': line, 'message': 'Nome e senha são campos obrigatórios'})
+                continue
+            if len(name) > NAME_MAX_LENGTH:
+                result['errors'].append({'row': line, 'message': 'Nome muito longo'})
+                continue
+            if name in seen:
+                result['conflicts'].append({'row': line, 'name': name, 'message': 'Nome repetido no arquivo'})
+                continue
+            seen.add(name)
+            valid.append((line, name, password))
+
+        # Uma consulta em lote ao índice de vazamentos por bloco
+        breached = set(find_breached([password for _, _, password in valid]))
+        if breached:
+            for index in sorted(breached):
+                result['errors'].append({'row': valid[index][0],
+                                         'message': 'Senha encontrada em vazamentos conhecidos'})
+            valid = [item for index, item in enumerate(valid) if index not in breached]
+
+        if valid:
+            result['imported'] += _import_chunk(user, valid, keyring, result['conflicts'])
+
+    return result
+
+
+def _import_chunk(user, valid, keyring, conflicts):
+    # Conflitos de _name_user_unique resolvidos com uma única consulta por lote
+    existing = {
+        name: (row_id, deleted_at)
+        for name, row_id, deleted_at in db.session.query(
+            SavedPassword.name, SavedPassword.id, SavedPassword.deleted_at
+        ).filter(
+            SavedPassword.user_id == user.id,
+            SavedPassword.name.in_([name for _, name, _ in valid])
+        )
+    }
+
+    accepted = []
+    tombstones = {}
+    for line, name, password in valid:
+        if name not in existing:
+            accepted.append((name, password))
+        elif existing[name][1] is not None:
+            tombstones[name] = existing[name][0]
+            accepted.append((name, password))
+        else:
+            conflicts.append({'row': line, 'name': name, 'message': 'Já existe uma senha com este nome'})
+    if not accepted:
+        return 0
+
+    now = datetime.utcnow()
+    seq = user.reserve_change_seqs(len(accepted))
+    inserts = []
+    revivals = []
+    for offset, (name, password) in enumerate(accepted):
+        values = {
+            'password': keyring.encrypt(password),
+            'created_at': now,
+            'change_seq': seq + offset,
+            'deleted_at': None,
+        }
+        if name in tombstones:
+            # Lápide com o mesmo nome: reaproveita a linha, como no cadastro individual.
+            # O UPDATE em lote não passa pelo @validates do modelo
+            revivals.append(dict(values, id=tombstones[name], name_normalized=normalize_name(name)))
+        else:
+            inserts.append(dict(values, name=name, user_id=user.id))
+
+    try:
+        if inserts:
+            db.session.execute(insert(SavedPassword), inserts)
+        if revivals:
+            db.session.execute(update(SavedPassword), revivals)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(accepted)
+
+
+def apply_operations(user, operations, atomic=True):
+    """Aplica create/rename/update/delete sobre o cofre em uma única transação.
+
+    Todas as linhas citadas são lidas com um `IN` filtrado por `user_id` e os
+    nomes são validados simulando o lote em memória, na ordem recebida; só
+    então o lote vira poucas instruções em conjunto. Com `atomic`, qualquer
+    operação inválida cancela o lote inteiro; sem ele, as demais são aplicadas.
+    """
+    results = [None] * len(operations)
+    parsed = []
+    for index, item in enumerate(operations):
+        op, row_id, name, password, error = _parse_operation(item)
+        if error:
+            results[index] = _failure(index, op, 'invalid', error)
+        else:
+            parsed.append((index, op, row_id, name, password))
+
+    # Uma consulta ao índice de vazamentos para todas as senhas novas do lote
+    with_password = [item for item in parsed if item[4] is not None]
+    for position in find_breached([item[4] for item in with_password]):
+        index, op = with_password[position][:2]
+        results[index] = _failure(index, op, 'breached', 'Senha encontrada em vazamentos conhecidos')
+    parsed = [item for item in parsed if results[item[0]] is None]
+
+    # Só as linhas ativas do próprio usuário: ids de outros usuários parecem inexistentes
+    ids = {row_id for _, op, row_id, _, _ in parsed if op != 'create'}
+    rows = {}
+    if ids:
+        rows = {
+            row_id: {'name': name, 'token': token}
+            for row_id, name, token in db.session.query(
+                SavedPassword.id, SavedPassword.name, SavedPassword.password
+            ).filter(
+                SavedPassword.user_id == user.id,
+                SavedPassword.deleted_at.is_(None),
+                SavedPassword.id.in_(ids)
+            )
+        }
+
+    names = {name for _, op, _, name, _ in parsed if name is not None}
+    active = {row['name']: row_id for row_id, row in rows.items()}
+    tombstones = {}
+    if names:
+        for name, row_id, deleted_at in db.session.query(
+            SavedPassword.name, SavedPassword.id, SavedPassword.deleted_at
+        ).filter(SavedPassword.user_id == user.id, SavedPassword.name.in_(names)):
+            if deleted_at is None:
+                active[name] = row_id
+            else:
+                tombstones[name] = row_id
+
+    creates = []
+    renamed = set()
+    released = set()
+    deleted = set()
+    touched = set()
+    for index, op, row_id, name, password in parsed:
+        if op != 'create' and (row_id not in rows or row_id in deleted):
+            results[index] = _failure(index, op, 'not_found', 'Senha não encontrada')
+            continue
+        if name is not None and name in active and (op == 'create' or active[name] != row_id):
+            results[index] = _failure(index, op, 'conflict', 'Já existe uma senha com este nome')
+            continue
+
+        if op == 'create':
+            revive = tombstones.pop(name, None)
+            if revive in deleted:
+                # Excluída neste mesmo lote: libera o nome e cria uma linha nova
+                released.add(revive)
+                revive = None
+            active[name] = None
+            creates.append((index, name, password, revive))
+            results[index] = {'index': index, 'op': op, 'status': 'ok', 'id': revive}
+            continue
+
+        row = rows[row_id]
+        if op == 'rename':
+            if name in tombstones:
+                released.add(tombstones.pop(name))
+            active.pop(row['name'], None)
+            active[name] = row_id
+            row['name'] = name
+            renamed.add(row_id)
+        elif op == 'update':
+            row['password'] = password
+        else:
+            active.pop(row['name'], None)
+            tombstones[row['name']] = row_id
+            deleted.add(row_id)
+        touched.add(row_id)
+        results[index] = {'index': index, 'op': op, 'status': 'ok', 'id': row_id}
+
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    if atomic and failed:
+        for index, result in enumerate(results):
+            if result['status'] == 'ok':
+                results[index] = _failure(index, result['op'], 'skipped', 'Lote cancelado por outra operação')
+        return {'applied': False, 'results': results, 'succeeded': 0, 'failed': failed}
+
+    # A criptografia fica para depois da validação: um lote recusado não cifra nada
+    changed = sorted(touched - deleted)
+    total = len(creates) + len(changed) + len(deleted)
+    if total:
+        try:
+            _write_operations(user, rows, creates, changed, deleted, renamed | released, results, total)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return {'applied': True, 'results': results, 'succeeded': len(results) - failed, 'failed': failed}
+
+
+def _parse_operation(item):
+    if not isinstance(item, dict):
+        return None, None, None, None, 'Operação malformada'
+    op = item.get('op')
+    if op not in MUTATION_OPS:
+        return op, None, None, None, 'op deve ser create, rename, update ou delete'
+
+    row_id = item.get('id')
+    if op != 'create' and (not isinstance(row_id, int) or isinstance(row_id, bool)):
+        return op, None, None, None, 'id é obrigatório'
+
+    name = None
+    if op in ('create', 'rename'):
+        name = item.get('name').strip() if isinstance(item.get('name'), str) else ''
+        if not name:
+            return op, row_id, None, None, 'Nome é obrigatório'
+        if len(name) > NAME_MAX_LENGTH:
+            return op, row_id, None, None, 'Nome muito longo'
+        if not name.isprintable():
+            return op, row_id, None, None, 'Nome com caracteres inválidos'
+
+    password = None
+    if op in ('create', 'update'):
+        password = item.get('password')
+        if not isinstance(password, str) or not password:
+            return op, row_id, name, None, 'Senha é obrigatória'
+    return op, row_id, name, password, None
+
+
+def _failure(index, op, status, message):
+    return {'index': index, 'op': op, 'status': status, 'message': message}
+
+
+def _released_name(row_id):
+    # Nome provisório fora da restrição unique; nomes válidos não têm caracteres de controle
+    return f'\x00{row_id}'
+
+
+def _row_token(keyring, row):
+    # Linhas só renomeadas mantêm o conteúdo cifrado atual
+    if 'password' in row:
+        return keyring.encrypt(row['password'])
+    return row['token']
+
+
+def _write_operations(user, rows, creates, changed, deleted, placeholders, results, total):
+    table = SavedPassword.__table__
+    owned = (table.c.user_id == bindparam('b_owner')) & (table.c.id == bindparam('b_id'))
+    keyring = get_keyring()
+    seq = user.reserve_change_seqs(total)
+    now = datetime.utcnow()
+
+    # Renomeações passam por um nome provisório: trocas e nomes liberados no
+    # mesmo lote não esbarram na restrição unique no meio do caminho. Os
+    # UPDATEs do Core não passam pelo @validates, então o nome normalizado
+    # acompanha cada troca de nome aqui mesmo
+    if placeholders:
+        db.session.execute(
+            update(table).where(owned).values(name=bindparam('b_name'),
+                                              name_normalized=bindparam('b_normalized')),
+            [{'b_owner': user.id, 'b_id': row_id, 'b_name': _released_name(row_id),
+              'b_normalized': normalize_name(_released_name(row_id))}
+             for row_id in sorted(placeholders)]
+        )
+
+    if deleted:
+        ids = sorted(deleted)
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == user.id, table.c.id.in_(ids))
+            .values(deleted_at=now, password='',
+                    change_seq=case({row_id: seq + offset for offset, row_id in enumerate(ids)},
+                                    value=table.c.id))
+        )
+        seq += len(ids)
+
+    if changed:
+        db.session.execute(
+            update(table).where(owned).values(
+                name=bindparam('b_name'), name_normalized=bindparam('b_normalized'),
+                password=bindparam('b_token'), change_seq=bindparam('b_seq')
+            ),
+            [{'b_owner': user.id, 'b_id': row_id, 'b_name': rows[row_id]['name'],
+              'b_normalized': normalize_name(rows[row_id]['name']),
+              'b_token': _row_token(keyring, rows[row_id]), 'b_seq': seq + offset}
+             for offset, row_id in enumerate(changed)]
+        )
+        seq += len(changed)
+
+    inserts = []
+    revivals = []
+    for offset, (index, name, password, revive) in enumerate(creates):
+        values = {'password': keyring.encrypt(password), 'created_at': now, 'change_seq': seq + offset, 'deleted_at': None}
+        if revive is None:
+            inserts.append(dict(values, name=name, user_id=user.id))
+        else:
+            # Lápide com o mesmo nome: reaproveita a linha, como no cadastro individual
+            revivals.append(dict(values, id=revive, name_normalized=normalize_name(name)))
+    if revivals:
+        db.session.execute(update(SavedPassword), revivals)
+    if inserts:
+        created = dict(db.session.execute(
+            insert(table).returning(table.c.name, table.c.id), inserts
+        ).all())
+        for index, name, _, revive in creates:
+            if revive is None:
+                results[index]['id'] = created[name]
+
+
+def export_passwords(user_id, fmt='csv', batch_size=IMPORT_BATCH_SIZE):
+    """Gera o cofre descriptografado linha a linha, em CSV ou NDJSON"""
+    keyring = get_keyring()
+    query = (SavedPassword.active()
+             .filter_by(user_id=user_id)
+             .order_by(SavedPassword.id)
+             .with_entities(SavedPassword.name, SavedPassword.password, SavedPassword.created_at))
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['name', 'password', 'created_at'])
+        for name, token, created_at in query.yield_per(batch_size):
+            writer.writerow([name, _reveal(keyring, token), created_at.isoformat()])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for name, token, created_at in query.yield_per(batch_size):
+        yield dumps({
+            'name': name,
+            'password': _reveal(keyring, token),
+            'created_at': created_at.isoformat()
+        }) + '\n'
+
+
+def _reveal(keyring, token):
+    # Linhas que não decifram (texto simples legado) saem vazias
+    return keyring.decrypt_or_none(token)
@@ -0,0 +1,94 @@
+import math
+import os
+import struct
+import sys
+from array import array
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+DEFAULT_WORDLIST = os.path.join(DATA_DIR, 'wordlist_pt.bin')
+
+# Layout do arquivo (little-endian):
+#
+#   magic | quantidade (uint32) | offsets ((N + 1) x uint32) | palavras em UTF-8 concatenadas
+#
+# A palavra i ocupa blob[offsets[i]:offsets[i + 1]]; não há separadores para interpretar.
+MAGIC = b'WORDLST1'
+HEADER = struct.Struct('<8sI')
+
+
+class Wordlist:
+    """Lista de palavras do Diceware carregada com uma única leitura do arquivo"""
+
+    def __init__(self, path=None):
+        self.path = None
+        self._blob = b''
+        self._offsets = array('I', [0])
+        if path:
+            self.load(path)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._blob[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    @property
+    def bits_per_word(self):
+        return math.log2(len(self)) if len(self) > 1 else 0.0
+
+    def configure(self, path=None):
+        self.load(path or DEFAULT_WORDLIST)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Arquivo não é uma lista de palavras: {path}')
+        table_end = HEADER.size + (count + 1) * 4
+        offsets = array('I')
+        offsets.frombytes(data[HEADER.size:table_end])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        self._offsets = offsets
+        self._blob = data[table_end:]
+        self.path = path
+
+    def words(self, indices):
+        blob = self._blob
+        offsets = self._offsets
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in indices]
+
+
+def pack_wordlist(source, output):
+    """Converte uma lista em texto (uma palavra por linha, opcionalmente no formato
+    `11111 palavra` do EFF) para o formato compacto, sem repetições"""
+    words = []
+    seen = set()
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            word = parts[-1].strip().lower()
+            if word in seen:
+                continue
+            seen.add(word)
+            words.append(word.encode('utf-8'))
+
+    offsets = array('I', [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+
+    tmp_output = output + '.tmp'
+    with open(tmp_output, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, len(words)))
+        offsets.tofile(out)
+        out.write(b''.join(words))
+    os.replace(tmp_output, output)
+    return {'words': len(words), 'size': os.path.getsize(output)}
+
+
+wordlist = Wordlist()
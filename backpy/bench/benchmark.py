@@ -0,0 +1,300 @@
+"""Benchmark dos caminhos críticos da API.
+
+Executar na pasta backpy:
+
+    python -m bench.benchmark                       # em processo (test client)
+    python -m bench.benchmark --mode http           # servidor HTTP local
+    python -m bench.benchmark --save-baseline       # grava bench/baseline.json
+    python -m bench.benchmark --quick               # menos iterações
+
+Cada execução usa um banco SQLite temporário, semeado com usuários e cofres
+sintéticos (10, 1k e 10k senhas). O resultado é comparado com o baseline
+gravado; o código de saída é 1 se algum cenário regredir além da tolerância.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+VAULT_SIZES = (10, 1000, 10000)
+BATCH_COUNT = 1000
+ENCODING_VARIANTS = {
+    'gzip': {'Accept-Encoding': 'gzip'},
+    'zstd': {'Accept-Encoding': 'zstd'},
+    'columns_gzip': {'Accept': 'application/vnd.senhas.columns+json', 'Accept-Encoding': 'gzip'},
+    'msgpack': {'Accept': 'application/msgpack'},
+    'msgpack_zstd': {'Accept': 'application/msgpack', 'Accept-Encoding': 'zstd'},
+}
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers or {})
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+    def close(self):
+        pass
+
+
+class HttpClient:
+    """Sobe o app em um servidor Werkzeug local (multithread) e fala HTTP de verdade"""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_port)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, iterations, call, items_per_call=1):
+    """`call(i)` devolve (status, corpo); mede latência, bytes recebidos e CPU do processo"""
+    latencies = []
+    received = 0
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for i in range(iterations):
+        begin = time.perf_counter()
+        status, body = call(i)
+        latencies.append(time.perf_counter() - begin)
+        received += len(body)
+        if status >= 400:
+            raise RuntimeError(f'{name}: resposta {status} na iteração {i}')
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'requests_per_s': round(iterations / elapsed, 1),
+        'items_per_s': round(iterations * items_per_call / elapsed, 1),
+        # CPU de cliente e servidor juntos no modo em processo; só do cliente+servidor local no modo http
+        'cpu_ms': round(cpu / iterations * 1000, 3),
+        'bytes': round(received / iterations),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def seed(app):
+    """Cria o schema, um usuário por tamanho de cofre e preenche o cofre com import em lote"""
+    from app import db
+    from app.models.user import User
+    from app.services.vault_io import import_passwords
+
+    with app.app_context():
+        db.create_all()
+        for size in VAULT_SIZES:
+            user = User(username=f'bench{size}', email=f'bench{size}@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            rows = ({'name': f'entrada-{i}', 'password': f'senha-sintetica-{i}'} for i in range(size))
+            import_passwords(user, rows)
+
+
+def login(client, size):
+    status, data = client.request('POST', '/auth/login',
+                                  {'username': f'bench{size}', 'password': 'bench-password'})
+    if status != 200:
+        raise RuntimeError(f'login bench{size} falhou: {status}')
+    return {'Authorization': 'Bearer ' + json.loads(data)['access_token']}
+
+
+def run_scenarios(client, scale):
+    def n(default):
+        return max(1, int(default * scale))
+
+    auth = {size: login(client, size) for size in VAULT_SIZES}
+    results = {}
+
+    results['generate_single'] = measure(
+        'generate_single', n(500),
+        lambda i: client.request('POST', '/api/generate', {'length': 16}))
+
+    results['generate_batch'] = measure(
+        'generate_batch', n(20),
+        lambda i: client.request('POST', '/api/generate/batch', {'count': BATCH_COUNT, 'length': 16}),
+        items_per_call=BATCH_COUNT)
+
+    results['login'] = measure(
+        'login', n(20),
+        lambda i: client.request('POST', '/auth/login',
+                                 {'username': 'bench10', 'password': 'bench-password'}))
+
+    for size, iterations in zip(VAULT_SIZES, (200, 20, 4)):
+        results[f'list_passwords_{size}'] = measure(
+            f'list_passwords_{size}', n(iterations),
+            lambda i, size=size: client.request('GET', '/api/passwords', headers=auth[size]),
+            items_per_call=size)
+
+    # Mesmo cofre de 1k senhas em cada representação negociada: bytes e CPU por requisição
+    for variant, headers in ENCODING_VARIANTS.items():
+        results[f'list_passwords_1000_{variant}'] = measure(
+            f'list_passwords_1000_{variant}', n(100),
+            lambda i, headers=headers: client.request('GET', '/api/passwords', headers=dict(auth[1000], **headers)),
+            items_per_call=1000)
+
+    created = []
+
+    def save(i):
+        status, data = client.request('POST', '/api/passwords',
+                                      {'name': f'bench-novo-{i}', 'password': 'senha-nova'},
+                                      headers=auth[1000])
+        if status == 201:
+            created.append(json.loads(data)['password_id'])
+        return status, data
+
+    results['save_password'] = measure('save_password', n(200), save)
+
+    results['delete_password'] = measure(
+        'delete_password', len(created),
+        lambda i: client.request('DELETE', f'/api/passwords/{created[i]}', headers=auth[1000]))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Retorna as regressões de p50/p95 acima da tolerância em relação ao baseline"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def print_report(results, baseline):
+    header = (f"{'cenário':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'itens/s':>12}"
+              f"{'CPU ms':>9}{'bytes':>10}{'RSS MB':>9}{'Δp50':>8}")
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        delta = ''
+        previous = baseline.get(name)
+        if previous and previous['p50_ms']:
+            delta = f"{(r['p50_ms'] / previous['p50_ms'] - 1) * 100:+.0f}%"
+        print(f"{name:<32}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['requests_per_s']:>10}{r['items_per_s']:>12}{r['cpu_ms']:>9}{r['bytes']:>10}"
+              f"{str(r['peak_rss_mb']):>9}{delta:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark da API de senhas')
+    parser.add_argument('--mode', choices=('inprocess', 'http'), default='inprocess')
+    parser.add_argument('--quick', action='store_true', help='Executa 20%% das iterações')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Aumento relativo de p50/p95 aceito antes de acusar regressão')
+    parser.add_argument('--json', dest='json_output', help='Grava os resultados neste arquivo')
+    args = parser.parse_args(argv)
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URI'] = 'sqlite:///' + db_file.name
+    os.environ.setdefault('HASH_WORKERS', '0')
+    # O benchmark dispara milhares de requisições do mesmo IP
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from app import create_app
+
+    app = create_app()
+    seed(app)
+
+    client = HttpClient(app) if args.mode == 'http' else InProcessClient(app)
+    try:
+        results = run_scenarios(client, 0.2 if args.quick else 1.0)
+    finally:
+        client.close()
+        os.unlink(db_file.name)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.mode, {}).get('results', {})
+
+    print_report(results, baseline)
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baselines[args.mode] = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline gravado em {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print('\nRegressões acima de {:.0%}:'.format(args.tolerance))
+        for name, metric, previous, current in regressions:
+            print(f'  {name} {metric}: {previous} -> {current}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,10 +4,10 @@ import os
 app = create_app()
 
 if __name__ == '__main__':
-    # Verifica se o banco de dados deve ser recriado (para migrações)
-    if os.environ.get('RECREATE_DB', '').lower() == 'true':
-        with app.app_context():
-            from app import db
+    with app.app_context():
+        from app import db
+        # Verifica se o banco de dados deve ser recriado (para migrações)
+        if os.environ.get('RECREATE_DB', '').lower() == 'true':
             print("Recriando tabelas de banco de dados...")
             db.drop_all()
             db.create_all()
@@ -21,14 +21,18 @@ if __name__ == '__main__':
                 db.session.add(user)
                 db.session.commit()
                 print("Usuário de teste criado: admin / admin123")
+        else:
+            # Servidor de desenvolvimento: cria as tabelas e colunas que faltarem.
+            # Em produção use `flask init-db` (ou `flask upgrade-db`) e o wsgi.py
+            from app.services.migration import upgrade_schema
+            upgrade_schema()
     
     # Inicia a aplicação
     host = os.environ.get('HOST', '0.0.0.0')
-    port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('DEBUG', 'True').lower() == 'true'
+    port = int(os.environ.get('PORT', 8089))
     
     print("\n=== Servidor Flask iniciado ===")
-    print("URL da API: http://localhost:5000")
+    print(f"URL da API: http://localhost:{port}")
     print("Para acessar a API de outro dispositivo, use seu IP local")
     print("Endpoints disponíveis:")
     print("  - /                (GET)  - Verificação de status")
@@ -40,4 +44,4 @@ if __name__ == '__main__':
     print("  - /api/passwords/id (DELETE) - Excluir senha (requer autenticação)")
     print("==============================\n")
     
-    app.run(host="0.0.0.0", port=8089) 
\ No newline at end of file
+    app.run(host=host, port=port) 
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+
+# Lidos pelo perfil de configuração a cada create_app
+os.environ['APP_CONFIG'] = 'testing'
+os.environ.setdefault('SECRET_KEY', 'chave-de-teste-com-32-caracteres!!')
+os.environ.setdefault('HASH_METHOD', 'pbkdf2:sha256:1000')
+os.environ.setdefault('HISTORY_ENABLED', 'false')
+
+import pytest
+
+from app import create_app, db
+
+# Tabelas como eram antes das colunas de sync, busca e exclusão lógica
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL,
+    username VARCHAR(64) NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(128) NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE (username),
+    UNIQUE (email)
+);
+CREATE TABLE saved_password (
+    id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    created_at DATETIME,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES user (id),
+    CONSTRAINT _name_user_unique UNIQUE (name, user_id)
+);
+"""
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """App de teste sobre um arquivo SQLite próprio; schema criado só com `create_schema`"""
+    def factory(path=None, create_schema=True):
+        path = path or tmp_path / 'app.db'
+        monkeypatch.setenv('DATABASE_URI', f'sqlite:///{path}')
+        app = create_app('testing')
+        if create_schema:
+            with app.app_context():
+                db.create_all()
+        return app
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """Arquivo SQLite com o schema original e um usuário com senhas em texto simples"""
+    path = tmp_path / 'baseline.db'
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.execute("INSERT INTO user VALUES (1, 'antigo', 'antigo@example.com', 'x', '2023-01-01 00:00:00')")
+    connection.executemany(
+        "INSERT INTO saved_password (name, password, created_at, user_id) VALUES (?, ?, ?, 1)",
+        [(f'Conta {n}', f'senha-{n}', f'2023-01-01 00:00:{n:02d}') for n in range(5)]
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+def register(client, username='usuario', password='Senha-Forte-123'):
+    client.post('/auth/register', json={
+        'username': username, 'email': f'{username}@example.com', 'password': password
+    })
+    response = client.post('/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)
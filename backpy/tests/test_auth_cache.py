@@ -0,0 +1,21 @@
+from app.services.auth_cache import Principal, PrincipalCache
+
+
+def test_principal_cache_invalidation_keeps_no_state_beyond_the_lru():
+    cache = PrincipalCache(maxsize=4, ttl=60)
+    for user_id in range(1000):
+        cache.put(f'token-{user_id}', Principal(user_id, 'u', 'e', None))
+        cache.invalidate_user(user_id)
+
+    assert all(len(value) <= 4 for value in vars(cache).values() if isinstance(value, dict))
+
+
+def test_principal_cache_invalidation_drops_only_that_user():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put('a', Principal(1, 'u1', 'e1', None))
+    cache.put('b', Principal(2, 'u2', 'e2', None))
+
+    cache.invalidate_user(1)
+
+    assert cache.get('a') is None
+    assert cache.get('b').id == 2
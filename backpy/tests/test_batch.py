@@ -0,0 +1,143 @@
+from app import db
+from app.models.user import SavedPassword, User
+from conftest import register
+
+
+def _batch(client, headers, *operations, **options):
+    return client.post('/api/passwords/batch', json={'operations': list(operations), **options}, headers=headers)
+
+
+def _create(client, headers, *names):
+    response = _batch(client, headers, *({'op': 'create', 'name': name, 'password': f'valor-{name}'}
+                                         for name in names))
+    assert response.status_code == 200
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def _vault(app, username='usuario'):
+    """Senhas ativas do usuário: nome -> (id, senha)"""
+    with app.app_context():
+        user = User.query.filter_by(username=username).one()
+        return {row.name: (row.id, row.get_password())
+                for row in SavedPassword.active().filter_by(user_id=user.id)}
+
+
+def _version(app, username='usuario'):
+    with app.app_context():
+        return User.query.filter_by(username=username).one().vault_version
+
+
+def test_batch_swaps_two_names_through_a_temporary_one(app, client, auth_headers):
+    first, second = _create(client, auth_headers, 'A', 'B')
+
+    response = _batch(client, auth_headers,
+                      {'op': 'rename', 'id': first, 'name': 'temp'},
+                      {'op': 'rename', 'id': second, 'name': 'A'},
+                      {'op': 'rename', 'id': first, 'name': 'B'})
+
+    assert response.status_code == 200
+    assert _vault(app) == {'A': (second, 'valor-B'), 'B': (first, 'valor-A')}
+
+
+def test_batch_swap_without_a_temporary_name_is_a_conflict(app, client, auth_headers):
+    first, second = _create(client, auth_headers, 'A', 'B')
+
+    response = _batch(client, auth_headers,
+                      {'op': 'rename', 'id': first, 'name': 'B'},
+                      {'op': 'rename', 'id': second, 'name': 'A'})
+
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['status'] == 'conflict'
+    assert _vault(app) == {'A': (first, 'valor-A'), 'B': (second, 'valor-B')}
+
+
+def test_batch_deletes_and_recreates_the_same_name(app, client, auth_headers):
+    row_id, = _create(client, auth_headers, 'A')
+
+    response = _batch(client, auth_headers,
+                      {'op': 'delete', 'id': row_id},
+                      {'op': 'create', 'name': 'A', 'password': 'nova'})
+
+    new_id = response.get_json()['results'][1]['id']
+    assert response.status_code == 200 and new_id != row_id
+    assert _vault(app) == {'A': (new_id, 'nova')}
+    # O feed entrega a exclusão da linha antiga e a criação da nova
+    body = client.get('/api/passwords/changes', query_string={'since': 1}, headers=auth_headers).get_json()
+    assert body['deleted'] == [row_id] and [entry['id'] for entry in body['changes']] == [new_id]
+
+
+def test_batch_rename_then_delete_frees_both_names(app, client, auth_headers):
+    row_id, = _create(client, auth_headers, 'A')
+
+    response = _batch(client, auth_headers,
+                      {'op': 'rename', 'id': row_id, 'name': 'C'},
+                      {'op': 'delete', 'id': row_id})
+
+    assert response.status_code == 200
+    assert _vault(app) == {}
+    _create(client, auth_headers, 'A', 'C')
+    assert set(_vault(app)) == {'A', 'C'}
+
+
+def test_batch_does_not_touch_other_users_rows(app, client, auth_headers):
+    row_id, = _create(client, auth_headers, 'A')
+    other = register(client, 'outro')
+    version = _version(app)
+
+    response = _batch(client, other,
+                      {'op': 'update', 'id': row_id, 'password': 'invasor'},
+                      {'op': 'rename', 'id': row_id, 'name': 'B'},
+                      {'op': 'delete', 'id': row_id})
+
+    assert response.status_code == 400
+    assert [result['status'] for result in response.get_json()['results']] == ['not_found'] * 3
+    assert _vault(app) == {'A': (row_id, 'valor-A')} and _version(app) == version
+
+
+def test_atomic_batch_applies_nothing_when_one_operation_fails(app, client, auth_headers):
+    first, second = _create(client, auth_headers, 'A', 'B')
+    version = _version(app)
+
+    response = _batch(client, auth_headers,
+                      {'op': 'create', 'name': 'C', 'password': 'valor-C'},
+                      {'op': 'update', 'id': first, 'password': 'alterada'},
+                      {'op': 'delete', 'id': second},
+                      {'op': 'delete', 'id': 999})
+
+    body = response.get_json()
+    assert response.status_code == 400 and not body['applied']
+    assert [result['status'] for result in body['results']] == ['skipped', 'skipped', 'skipped', 'not_found']
+    assert _vault(app) == {'A': (first, 'valor-A'), 'B': (second, 'valor-B')}
+    assert _version(app) == version
+
+
+def test_non_atomic_batch_applies_the_valid_operations(app, client, auth_headers):
+    first, = _create(client, auth_headers, 'A')
+
+    response = _batch(client, auth_headers,
+                      {'op': 'update', 'id': first, 'password': 'alterada'},
+                      {'op': 'delete', 'id': 999}, atomic=False)
+
+    body = response.get_json()
+    assert response.status_code == 200 and body['succeeded'] == 1 and body['failed'] == 1
+    assert _vault(app) == {'A': (first, 'alterada')}
+
+
+def test_batch_rolls_back_when_the_write_fails(app, client, auth_headers, monkeypatch):
+    first, = _create(client, auth_headers, 'A')
+    version = _version(app)
+    original = db.session.execute
+
+    def failing_insert(statement, *args, **kwargs):
+        if getattr(statement, 'is_insert', False):
+            raise RuntimeError('falha de escrita')
+        return original(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db.session, 'execute', failing_insert)
+    response = _batch(client, auth_headers,
+                      {'op': 'update', 'id': first, 'password': 'alterada'},
+                      {'op': 'create', 'name': 'B', 'password': 'valor-B'})
+    monkeypatch.undo()
+
+    assert response.status_code == 500
+    assert _vault(app) == {'A': (first, 'valor-A')} and _version(app) == version
@@ -0,0 +1,41 @@
+import pytest
+
+from app.config import ProductionConfig, get_config
+
+
+def test_profile_reads_the_environment_when_selected(make_app, monkeypatch):
+    monkeypatch.setenv('PAGE_MAX_LIMIT', '7')
+    monkeypatch.setenv('RATE_LIMIT_LOGIN', '3/minute')
+
+    assert get_config('testing').PAGE_MAX_LIMIT == 7
+    app = make_app()
+    assert app.config['PAGE_MAX_LIMIT'] == 7 and app.config['RATE_LIMITS']['login'] == '3/minute'
+
+
+def test_profiles_do_not_share_mutable_settings():
+    first, second = get_config('testing'), get_config('testing')
+    first.RATE_LIMITS['login'] = '1/second'
+
+    assert second.RATE_LIMITS['login'] != '1/second'
+
+
+def test_production_requires_a_secret_key(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY')
+
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        get_config('production')
+    assert get_config('development').SECRET_KEY == 'dev-secret-key'
+
+
+def test_production_uses_the_configured_secret_key(monkeypatch):
+    monkeypatch.setenv('SECRET_KEY', 'chave-de-producao')
+
+    config = get_config('production')
+
+    assert isinstance(config, ProductionConfig)
+    assert config.SECRET_KEY == 'chave-de-producao' and config.SQLITE_PRAGMAS['journal_mode'] == 'WAL'
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_config('staging')
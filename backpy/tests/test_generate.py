@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from app.routes import password as password_routes
+from app.services.generator import engine
+from app.services.policy import PolicyError, compile_policy
+
+
+@pytest.mark.parametrize('count', [True, False, 0, '3', 1.5])
+def test_batch_rejects_non_integer_count(client, count):
+    response = client.post('/api/generate/batch', json={'count': count, 'length': 12})
+
+    assert response.status_code == 400
+
+
+def test_batch_accepts_integer_count(client):
+    response = client.post('/api/generate/batch', json={'count': 3, 'length': 12})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('cached, rejected', [
+    ({'min_uppercase': 1}, {'min_uppercase': True}),
+    ({'length': 12}, {'length': 12.0}),
+])
+def test_policy_validation_does_not_depend_on_the_cache(cached, rejected):
+    compile_policy(**cached)
+
+    with pytest.raises(PolicyError):
+        compile_policy(**rejected)
+
+
+@pytest.fixture
+def stream_client(make_app, monkeypatch):
+    """Lotes acima de 10 senhas em NDJSON, geradas em partes de 7"""
+    monkeypatch.setenv('BATCH_STREAM_THRESHOLD', '10')
+    monkeypatch.setattr(password_routes, 'GENERATE_STREAM_CHUNK', 7)
+    return make_app().test_client()
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_streamed_batch_is_generated_chunk_by_chunk(stream_client, monkeypatch):
+    chunks = []
+    original = engine.generate_policy_batch
+    monkeypatch.setattr(engine, 'generate_policy_batch',
+                        lambda count, policy: chunks.append(count) or original(count, policy))
+
+    response = stream_client.post('/api/generate/batch', json={'count': 25, 'length': 12}, buffered=False)
+
+    # Só a primeira parte é gerada antes da resposta; o resto, enquanto o corpo é lido
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    assert chunks == [7]
+    lines = _lines(response)
+    assert chunks == [7, 7, 7, 4]
+    assert len(lines) == 25 and all(len(line['password']) == 12 for line in lines)
+
+
+def test_streamed_batch_rejects_a_policy_that_only_yields_breached_passwords(stream_client, monkeypatch):
+    monkeypatch.setattr(password_routes, 'find_breached', lambda passwords: list(range(len(passwords))))
+
+    response = stream_client.post('/api/generate/batch', json={'count': 25, 'length': 12})
+
+    assert response.status_code == 400
+
+
+def test_streamed_batch_ends_with_an_error_line_when_a_later_chunk_fails(stream_client, monkeypatch):
+    failing = []
+    monkeypatch.setattr(password_routes, 'find_breached',
+                        lambda passwords: list(range(len(passwords))) if failing else [])
+
+    response = stream_client.post('/api/generate/batch', json={'count': 25, 'length': 12}, buffered=False)
+    failing.append(True)
+    lines = _lines(response)
+
+    assert response.status_code == 200
+    assert len(lines) == 8 and 'password' not in lines[-1] and lines[-1]['message']
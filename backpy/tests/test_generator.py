@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from app.services.generator import engine
+from app.services.policy import compile_policy
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requer fork')
+def test_forked_child_does_not_reuse_the_parent_buffer():
+    policy = compile_policy(20, True, True, True, True)
+    engine.generate_policy_batch(1, policy)
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, engine.generate_policy_batch(1, policy)[0].encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert os.read(read_end, 64).decode() != engine.generate_policy_batch(1, policy)[0]
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.services.hashing import HashingPool, HashingPoolBusy
+
+
+@pytest.fixture
+def pool():
+    pool = HashingPool(workers=1, max_pending=1, timeout=0.2)
+    yield pool
+    pool.shutdown()
+
+
+def test_hashing_slot_is_held_until_the_worker_finishes(pool):
+    with pytest.raises(HashingPoolBusy):
+        pool._run('teste', time.sleep, 1)
+
+    # O sleep segue rodando no processo: o slot continua ocupado
+    with pytest.raises(HashingPoolBusy):
+        pool._run('teste', abs, -1)
+    stats = pool.stats()
+    assert stats['timeouts'] == 1 and stats['rejected'] == 1 and stats['completed'] == 0
+
+    deadline = time.monotonic() + 5
+    while pool.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._run('teste', abs, -1) == 1
+    assert pool.stats()['completed'] == 1
+
+
+def test_hashing_pool_recovers_from_a_dead_worker(pool):
+    pool.timeout = 5
+    with pytest.raises(HashingPoolBusy):
+        pool._run('teste', os._exit, 1)
+
+    assert pool._run('teste', abs, -2) == 2
+    stats = pool.stats()
+    assert stats['failures'] == 1 and stats['completed'] == 1 and stats['pending'] == 0
+
+
+def test_needs_rehash_understands_short_method_names():
+    pool = HashingPool()
+    pool.configure(workers=0, max_pending=1, method='scrypt')
+
+    assert not pool.needs_rehash(generate_password_hash('senha', 'scrypt'))
+    assert not pool.needs_rehash(generate_password_hash('senha', 'scrypt:32768:8:1'))
+    assert pool.needs_rehash(generate_password_hash('senha', 'pbkdf2:sha256:1000'))
+
+
+def test_configure_rejects_an_unknown_method():
+    with pytest.raises(ValueError):
+        HashingPool().configure(workers=0, max_pending=1, method='md5')
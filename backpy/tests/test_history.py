@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from app.models.history import GenerationEvent
+from app.services.history import history_writer
+from conftest import register
+
+
+@pytest.fixture
+def writer(app):
+    """Fila do histórico ligada para o app de teste; a thread é parada no fim"""
+    def configure(flush_interval=60, batch_size=100):
+        history_writer.configure(app, True, batch_size, flush_interval, max_queue=1000)
+        return history_writer
+    yield configure
+    history_writer.shutdown()
+    history_writer.configure(app, False, 100, 1, 1000)
+
+
+def _events(app):
+    with app.app_context():
+        return GenerationEvent.query.order_by(GenerationEvent.id).all()
+
+
+def _generate(client, headers, **options):
+    response = client.post('/api/generate', json={'length': 12, **options}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['password']
+
+
+def test_writer_flushes_on_its_interval(app, client, auth_headers, writer):
+    writer(flush_interval=0.05)
+    written = history_writer.stats()['written']
+
+    _generate(client, auth_headers)
+
+    deadline = time.monotonic() + 5
+    while not _events(app) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(_events(app)) == 1
+    assert history_writer.stats()['written'] == written + 1
+
+
+def test_writer_flushes_the_queue_on_shutdown(app, client, auth_headers, writer):
+    writer(flush_interval=60)
+    for _ in range(3):
+        _generate(client, auth_headers)
+    assert _events(app) == [] and history_writer.stats()['queued'] == 3
+
+    history_writer.shutdown()
+
+    assert len(_events(app)) == 3
+    assert history_writer.stats()['queued'] == 0
+
+
+def test_generations_without_a_token_are_not_recorded(app, client, writer):
+    writer()
+
+    _generate(client, {})
+    history_writer.flush()
+
+    assert _events(app) == []
+
+
+def test_history_lists_only_the_callers_events(app, client, auth_headers, writer):
+    writer()
+    other = register(client, 'outro')
+    stored = _generate(client, auth_headers, store_in_history=True)
+    _generate(client, auth_headers)
+    _generate(client, other)
+    history_writer.flush()
+
+    body = client.get('/api/history', headers=auth_headers).get_json()
+    metadata = client.get('/api/history', query_string={'fields': 'metadata'}, headers=auth_headers).get_json()
+    others = client.get('/api/history', headers=other).get_json()
+
+    # Mais recente primeiro; só o pedido com store_in_history guarda a senha
+    assert [(entry['stored'], entry['password']) for entry in body['history']] == [(False, None), (True, stored)]
+    assert all('password' not in entry for entry in metadata['history'])
+    assert len(others['history']) == 1 and not others['history'][0]['stored']
+
+
+def test_history_pages_with_a_cursor(client, auth_headers, writer):
+    writer()
+    for _ in range(3):
+        _generate(client, auth_headers)
+    history_writer.flush()
+
+    first = client.get('/api/history', query_string={'limit': 2}, headers=auth_headers).get_json()
+    rest = client.get('/api/history', query_string={'limit': 2, 'cursor': first['next_cursor']},
+                      headers=auth_headers).get_json()
+
+    ids = [entry['id'] for entry in first['history'] + rest['history']]
+    assert ids == [3, 2, 1] and rest['next_cursor'] is None
+
+
+def test_history_requires_a_token(client):
+    assert client.get('/api/history').status_code == 401
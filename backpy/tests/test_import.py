@@ -0,0 +1,21 @@
+def test_import_reports_non_string_fields_per_row(client, auth_headers):
+    rows = [
+        {'name': 1, 'password': 2},
+        {'name': 'válida', 'password': 'segredo-1'},
+        {'name': 'lista', 'password': ['a']},
+        {'name': {'a': 1}, 'password': 'segredo-2'},
+    ]
+
+    response = client.post('/api/passwords/import', json=rows, headers=auth_headers)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['imported'] == 1
+    assert [error['row'] for error in body['errors']] == [1, 3, 4]
+    assert {error['message'] for error in body['errors']} == {'Nome e senha devem ser texto'}
+
+
+def test_import_still_requires_both_fields(client, auth_headers):
+    response = client.post('/api/passwords/import', json=[{'name': 'sem senha'}], headers=auth_headers)
+
+    assert response.get_json()['errors'] == [{'row': 1, 'message': 'Nome e senha são campos obrigatórios'}]
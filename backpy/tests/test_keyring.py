@@ -0,0 +1,49 @@
+from app import db
+from app.models.checkpoint import MigrationCheckpoint
+from app.models.user import SavedPassword, User
+from app.services.keyring import (configure_keyring, get_keyring, keyring_stats, reencrypt_saved_passwords,
+                                  rotation_checkpoint_name)
+
+
+def test_keyring_comes_from_app_config(make_app, monkeypatch):
+    app = make_app()
+    # O ambiente só é lido na escolha do perfil; o key ring segue o app.config
+    monkeypatch.setenv('SECRET_KEY', 'outro-segredo-que-o-app-nao-usa')
+
+    assert get_keyring().secrets[0] == app.config['SECRET_KEY']
+    assert get_keyring() is get_keyring()
+
+
+def test_keyring_stats_count_cache_hits(app):
+    before = keyring_stats()['cache_hits']
+    for _ in range(3):
+        get_keyring()
+
+    # Ler as estatísticas não conta como acerto
+    assert keyring_stats()['cache_hits'] == before + 3
+    assert keyring_stats()['cache_hits'] == before + 3
+
+
+def test_rotation_resumes_from_its_checkpoint(app):
+    old_secret = app.config['SECRET_KEY']
+    with app.app_context():
+        user = User(username='dono', email='dono@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        for n in range(4):
+            row = SavedPassword(name=f'conta {n}', user_id=user.id)
+            row.set_password(f'segredo-{n}')
+            db.session.add(row)
+        db.session.commit()
+
+        keyring = configure_keyring('nova-chave-de-32-caracteres-ok!!', (old_secret,))
+        # Execução anterior interrompida depois do segundo lote
+        MigrationCheckpoint.load(rotation_checkpoint_name(keyring)).last_id = 2
+        db.session.commit()
+
+        result = reencrypt_saved_passwords(chunk_size=1)
+
+        assert result == {'rotated': 2, 'skipped': 0, 'last_id': 4}
+        rows = SavedPassword.query.order_by(SavedPassword.id).all()
+        assert [keyring.is_current(row.password) for row in rows] == [False, False, True, True]
+        assert reencrypt_saved_passwords(restart=True)['rotated'] == 2
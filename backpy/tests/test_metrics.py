@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+
+@pytest.fixture
+def metrics_app(make_app, monkeypatch):
+    monkeypatch.setenv('METRICS_ENABLED', 'true')
+    return make_app()
+
+
+def test_failed_query_does_not_leave_a_timer_behind(metrics_app):
+    with metrics_app.app_context(), db.engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM tabela_inexistente'))
+        assert connection.info['_metrics_query_started'] == []
+
+        connection.execute(text('SELECT 1'))
+        assert connection.info['_metrics_query_started'] == []
+
+
+def test_metrics_endpoint_exports_the_sql_timings(metrics_app):
+    client = metrics_app.test_client()
+    client.get('/')
+    with metrics_app.app_context():
+        db.session.execute(text('SELECT 1'))
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'operation="sql_query"' in body
@@ -0,0 +1,91 @@
+import sqlite3
+
+from app import db
+from app.models.user import SavedPassword, User
+from app.services.keyring import is_fernet_token
+from app.services.migration import backfill_name_index, migrate_plaintext_passwords, upgrade_schema
+
+
+def _columns(path, table):
+    with sqlite3.connect(path) as connection:
+        return {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+
+
+def test_upgrade_adds_columns_and_numbers_rows(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        result = upgrade_schema(chunk_size=2)
+
+        seqs = [row.change_seq for row in SavedPassword.query.order_by(SavedPassword.id)]
+        user = db.session.get(User, 1)
+        assert seqs == [1, 2, 3, 4, 5]
+        assert user.vault_version == 5
+        assert result['numbered'] == 5
+        assert SavedPassword.query.filter_by(name_normalized='conta 3').count() == 1
+
+    assert {'change_seq', 'deleted_at', 'name_normalized'} <= _columns(baseline_db, 'saved_password')
+    assert 'vault_version' in _columns(baseline_db, 'user')
+
+
+def test_upgrade_is_idempotent(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        upgrade_schema()
+        again = upgrade_schema()
+
+        assert again == {'columns': [], 'numbered': 0, 'versions': 0, 'names': 0}
+        assert db.session.get(User, 1).vault_version == 5
+
+
+def test_upgraded_database_serves_the_changes_feed(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        upgrade_schema()
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'novo', 'email': 'novo@example.com', 'password': 'Senha-Forte-1'})
+    with app.app_context():
+        # Dono das senhas antigas passa a ter um hash válido para o login
+        user = db.session.get(User, 1)
+        user.set_password('Senha-Antiga-1')
+        db.session.commit()
+    token = client.post('/auth/login', json={'username': 'antigo', 'password': 'Senha-Antiga-1'}).get_json()
+    headers = {'Authorization': f"Bearer {token['access_token']}"}
+
+    body = client.get('/api/passwords/changes', query_string={'since': 2}, headers=headers).get_json()
+
+    assert [entry['id'] for entry in body['changes']] == [3, 4, 5]
+
+
+def test_migrate_plaintext_runs_on_the_baseline_schema(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        result = migrate_plaintext_passwords(chunk_size=2)
+
+        assert result['migrated'] == 5
+        rows = SavedPassword.query.order_by(SavedPassword.id).all()
+        assert all(is_fernet_token(row.password) for row in rows)
+        assert rows[0].get_password() == 'senha-0'
+
+
+def test_migrate_plaintext_publishes_the_rows_again(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        upgrade_schema()
+        version = db.session.get(User, 1).vault_version
+
+        migrate_plaintext_passwords(chunk_size=2)
+
+        rows = SavedPassword.query.order_by(SavedPassword.id).all()
+        assert [row.change_seq for row in rows] == list(range(version + 1, version + 6))
+        assert db.session.get(User, 1).vault_version == version + 5
+        # Nada mais a cifrar: uma nova execução não mexe nas sequências
+        migrate_plaintext_passwords(restart=True)
+        assert db.session.get(User, 1).vault_version == version + 5
+
+
+def test_index_names_runs_on_the_baseline_schema(make_app, baseline_db):
+    app = make_app(baseline_db, create_schema=False)
+    with app.app_context():
+        assert backfill_name_index()['updated'] == 5
+
+    assert 'change_seq' not in _columns(baseline_db, 'saved_password')
@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.fixture
+def limited_app(make_app, monkeypatch):
+    """App com limite ligado: 1 geração e 2 análises de força por minuto"""
+    def factory(**environ):
+        monkeypatch.setenv('RATE_LIMIT_ENABLED', 'true')
+        monkeypatch.setenv('RATE_LIMIT_GENERATE', '1/minute')
+        monkeypatch.setenv('RATE_LIMIT_STRENGTH', '2/minute')
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        return make_app()
+    return factory
+
+
+def _strength(client, **headers):
+    return client.post('/api/strength', json={'password': 'Senha-Forte-123'}, headers=headers).status_code
+
+
+def test_strength_has_its_own_rule(limited_app):
+    client = limited_app().test_client()
+
+    assert client.post('/api/generate', json={'length': 12}).status_code == 200
+    assert client.post('/api/generate', json={'length': 12}).status_code == 429
+    assert [_strength(client) for _ in range(3)] == [200, 200, 429]
+
+
+def test_forwarded_for_is_ignored_without_proxy_fix(limited_app):
+    client = limited_app().test_client()
+
+    statuses = [_strength(client, **{'X-Forwarded-For': f'203.0.113.{n}'}) for n in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+
+def test_proxy_fix_limits_each_forwarded_client(limited_app):
+    client = limited_app(PROXY_FIX_X_FOR='1').test_client()
+
+    statuses = [_strength(client, **{'X-Forwarded-For': f'203.0.113.{n}'}) for n in range(3)]
+
+    assert statuses == [200, 200, 200]
+    assert [_strength(client, **{'X-Forwarded-For': '203.0.113.0'}) for _ in range(2)] == [200, 429]
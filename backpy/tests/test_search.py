@@ -0,0 +1,102 @@
+from app import db
+from app.models.user import SavedPassword, normalize_name
+from app.routes.password import _password_query
+from app.services.search import search_index_available
+
+NAMES = ['Café da Manhã', 'Banco "Central"', 'a_b%c', 'Conta Corrente', 'Email pessoal']
+
+
+def _search(client, headers, q, match='substring'):
+    body = client.get('/api/passwords', query_string={'q': q, 'match': match, 'fields': 'metadata'},
+                      headers=headers).get_json()
+    return sorted(entry['name'] for entry in body['passwords'])
+
+
+def _save_names(client, headers):
+    for name in NAMES:
+        client.post('/api/passwords', json={'name': name, 'password': 'segredo'}, headers=headers)
+
+
+def test_substring_search_uses_the_trigram_index(app, client, auth_headers):
+    _save_names(client, auth_headers)
+
+    assert _search(client, auth_headers, 'CAFÉ DA') == ['Café da Manhã']
+    assert _search(client, auth_headers, 'l"') == ['Banco "Central"']
+    assert _search(client, auth_headers, 'b%c') == ['a_b%c']
+    assert _search(client, auth_headers, 'rre') == ['Conta Corrente']
+    with app.app_context():
+        assert search_index_available(db.engine)
+        statement = _password_query(1, None, 50, True, ('manha', 'substring')).statement
+        sql = str(statement.compile(compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[3] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)))
+    assert 'USING INTEGER PRIMARY KEY' in plan
+    assert 'ix_saved_password_user_created' not in plan
+
+
+def test_short_terms_and_prefixes_skip_the_trigram_index(client, auth_headers):
+    _save_names(client, auth_headers)
+
+    assert _search(client, auth_headers, 'rr') == ['Conta Corrente']
+    assert _search(client, auth_headers, 'a_') == ['a_b%c']
+    assert _search(client, auth_headers, 'ban', match='prefix') == ['Banco "Central"']
+
+
+def test_search_index_follows_renames_and_deletes(client, auth_headers):
+    _save_names(client, auth_headers)
+    operations = [
+        {'op': 'rename', 'id': 1, 'name': 'Padaria'},
+        {'op': 'delete', 'id': 5},
+    ]
+    assert client.post('/api/passwords/batch', json={'operations': operations},
+                       headers=auth_headers).status_code == 200
+
+    assert _search(client, auth_headers, 'cafe') == []
+    assert _search(client, auth_headers, 'adari') == ['Padaria']
+    assert _search(client, auth_headers, 'pessoal') == []
+
+
+def _normalized_mismatches(app):
+    with app.app_context():
+        rows = SavedPassword.query.all()
+        return [(row.name, row.name_normalized) for row in rows if row.name_normalized != normalize_name(row.name)]
+
+
+def test_core_renames_keep_the_normalized_name(app, client, auth_headers):
+    _save_names(client, auth_headers)
+    operations = [
+        # Troca por nome provisório, exclusão + recriação e renomear + excluir
+        {'op': 'rename', 'id': 1, 'name': 'Temporário'},
+        {'op': 'rename', 'id': 2, 'name': 'Café da Manhã'},
+        {'op': 'rename', 'id': 1, 'name': 'Banco Novo'},
+        {'op': 'delete', 'id': 3},
+        {'op': 'create', 'name': 'a_b%c', 'password': 'outra'},
+        {'op': 'rename', 'id': 4, 'name': 'Poupança'},
+        {'op': 'delete', 'id': 4},
+    ]
+    assert client.post('/api/passwords/batch', json={'operations': operations},
+                       headers=auth_headers).status_code == 200
+
+    assert _normalized_mismatches(app) == []
+    assert _search(client, auth_headers, 'banco') == ['Banco Novo']
+    assert _search(client, auth_headers, 'cafe', match='prefix') == ['Café da Manhã']
+    assert _search(client, auth_headers, 'corrente') == [] and _search(client, auth_headers, 'poupanca') == []
+
+
+def test_revivals_restore_the_normalized_name(app, client, auth_headers):
+    _save_names(client, auth_headers)
+    for row_id in (1, 4):
+        client.delete(f'/api/passwords/{row_id}', headers=auth_headers)
+    # Lápides gravadas antes da correção, com o nome normalizado defasado
+    with app.app_context():
+        db.session.execute(db.text("UPDATE saved_password SET name_normalized = 'defasado' WHERE id IN (1, 4)"))
+        db.session.commit()
+
+    imported = client.post('/api/passwords/import', json=[{'name': 'Café da Manhã', 'password': 'nova'}],
+                           headers=auth_headers)
+    batch = client.post('/api/passwords/batch', headers=auth_headers,
+                        json={'operations': [{'op': 'create', 'name': 'Conta Corrente', 'password': 'nova'}]})
+
+    assert imported.status_code == 200 and batch.get_json()['results'][0]['id'] == 4
+    assert _normalized_mismatches(app) == []
+    assert _search(client, auth_headers, 'manha') == ['Café da Manhã']
+    assert _search(client, auth_headers, 'corrente') == ['Conta Corrente']
@@ -0,0 +1,108 @@
+import sqlite3
+
+from sqlalchemy import event
+
+from app import db
+from conftest import register
+
+
+def _sync(client, headers, since='0', limit=2):
+    """Percorre o feed como o cliente: repassa o cursor até has_more ser falso"""
+    ids = []
+    for _ in range(50):
+        body = client.get('/api/passwords/changes', query_string={'since': since, 'limit': limit},
+                          headers=headers).get_json()
+        ids += [entry['id'] for entry in body['changes']] + body['deleted']
+        since = body['cursor']
+        if not body['has_more']:
+            return ids, since
+    raise AssertionError('o feed não terminou')
+
+
+def _save(client, headers, count):
+    for n in range(count):
+        response = client.post('/api/passwords', json={'name': f'senha {n}', 'password': f'valor-{n}'},
+                               headers=headers)
+        assert response.status_code == 201
+
+
+def test_changes_pages_through_every_row_once(client, auth_headers):
+    _save(client, auth_headers, 5)
+
+    ids, cursor = _sync(client, auth_headers)
+
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+    assert cursor == 5
+
+
+def test_changes_with_shared_sequences_neither_skips_nor_repeats(app, client, auth_headers):
+    _save(client, auth_headers, 5)
+    # Banco antigo antes da numeração: todas as linhas na sequência 0
+    with app.app_context():
+        db.session.execute(db.text('UPDATE saved_password SET change_seq = 0'))
+        db.session.execute(db.text('UPDATE user SET vault_version = 0'))
+        db.session.commit()
+
+    ids, _ = _sync(client, auth_headers)
+
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+
+
+def test_changes_resumes_from_a_compound_cursor(client, auth_headers):
+    _save(client, auth_headers, 3)
+
+    first = client.get('/api/passwords/changes', query_string={'limit': 2}, headers=auth_headers).get_json()
+    rest = client.get('/api/passwords/changes', query_string={'since': first['cursor']},
+                      headers=auth_headers).get_json()
+
+    assert first['has_more'] and first['cursor'] == '2:2'
+    assert [entry['id'] for entry in rest['changes']] == [3]
+    assert rest['cursor'] == 3 and not rest['has_more']
+
+
+def test_changes_rejects_a_malformed_cursor(client, auth_headers):
+    response = client.get('/api/passwords/changes', query_string={'since': 'abc:1'}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_changes_are_isolated_per_user(client, auth_headers):
+    _save(client, auth_headers, 2)
+    other = register(client, 'outro')
+
+    ids, cursor = _sync(client, other)
+
+    assert ids == [] and cursor == 0
+
+
+def test_changes_does_not_skip_a_write_committed_during_the_query(app, client, auth_headers):
+    _save(client, auth_headers, 1)
+    path = app.config['SQLALCHEMY_DATABASE_URI'].removeprefix('sqlite:///')
+    # Como em produção: no WAL a leitura em andamento não bloqueia o escritor
+    setup = sqlite3.connect(path)
+    setup.execute('PRAGMA journal_mode=WAL')
+    setup.close()
+    fired = []
+
+    def write_elsewhere(conn, cursor, statement, parameters, context, executemany):
+        # Outro processo grava entre a consulta das linhas e o fim da resposta
+        if fired or 'FROM saved_password' not in statement:
+            return
+        fired.append(True)
+        other = sqlite3.connect(path)
+        other.execute('UPDATE user SET vault_version = vault_version + 1')
+        other.execute("INSERT INTO saved_password (name, name_normalized, password, created_at, user_id, change_seq) "
+                      "SELECT 'concorrente', 'concorrente', 'x', '2024-01-01 00:00:00', id, vault_version FROM user")
+        other.commit()
+        other.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'after_cursor_execute', write_elsewhere)
+        try:
+            ids, cursor = _sync(client, auth_headers, limit=10)
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', write_elsewhere)
+    later, _ = _sync(client, auth_headers, since=cursor, limit=10)
+
+    assert fired and ids == [1]
+    assert cursor == 1 and later == [2]
@@ -0,0 +1,9 @@
+# Ponto de entrada de produção para servidores WSGI com vários workers:
+#   gunicorn -w 4 -b 0.0.0.0:8089 wsgi:app        (Linux/macOS)
+#   waitress-serve --port=8089 wsgi:app           (Windows)
+# Não cria tabelas no boot; rode `flask --app wsgi init-db` uma vez antes.
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('APP_CONFIG', 'production'))
@@ -1,6 +1,7 @@
 import axios from 'axios';
 import { getAuthToken } from '../../utils/authUtils';
 import { Platform } from 'react-native';
+import { getSyncCursor, applyPasswordChanges } from '../storageService';
 
 // API base URL dinâmico baseado na plataforma
 // 10.0.2.2 para Android emulator, 127.0.0.1 para web, e o IP real para iOS/outros
@@ -60,13 +61,26 @@ api.interceptors.response.use(
 // Generate a password using the API (apenas fallback)
 export const generatePassword = async (options = {}) => {
   try {
-    const response = await api.post('/api/generate', {
-      length: options.length || 12,
-      include_uppercase: options.includeUppercase ?? true,
-      include_lowercase: options.includeLowercase ?? true,
-      include_numbers: options.includeNumbers ?? true,
-      include_symbols: options.includeSymbols ?? true
-    });
+    const body = options.mode === 'passphrase'
+      ? {
+          mode: 'passphrase',
+          words: options.words || 6,
+          separator: options.separator ?? '-',
+          capitalize: options.capitalize ?? false,
+          include_number: options.includeNumber ?? false
+        }
+      : {
+          length: options.length || 12,
+          include_uppercase: options.includeUppercase ?? true,
+          include_lowercase: options.includeLowercase ?? true,
+          include_numbers: options.includeNumbers ?? true,
+          include_symbols: options.includeSymbols ?? true
+        };
+    if (options.storeInHistory) {
+      // Guarda o valor (cifrado) no histórico do servidor; sem isso só as opções são registradas
+      body.store_in_history = true;
+    }
+    const response = await api.post('/api/generate', body);
     return response.data.password;
   } catch (error) {
     console.error('Error generating password:', error);
@@ -74,6 +88,28 @@ export const generatePassword = async (options = {}) => {
   }
 };
 
+// Evaluate password strength on the server (dicionários, teclado, datas e vazamentos)
+export const checkPasswordStrength = async (password) => {
+  try {
+    const response = await api.post('/api/strength', { password });
+    return response.data;
+  } catch (error) {
+    console.error('Error checking password strength:', error);
+    throw error;
+  }
+};
+
+// Audit the strength of every saved password (sem devolver as senhas)
+export const auditSavedPasswords = async () => {
+  try {
+    const response = await api.get('/api/passwords/audit');
+    return response.data;
+  } catch (error) {
+    console.error('Error auditing saved passwords:', error);
+    throw error;
+  }
+};
+
 // Get saved passwords from the API
 export const getSavedPasswords = async () => {
   try {
@@ -85,6 +121,71 @@ export const getSavedPasswords = async () => {
   }
 };
 
+// Get only id/name/created_at of saved passwords (sem descriptografar no servidor)
+export const getSavedPasswordsMetadata = async () => {
+  try {
+    const response = await api.get('/api/passwords', { params: { fields: 'metadata' } });
+    return response.data.passwords;
+  } catch (error) {
+    console.error('Error getting saved passwords metadata:', error);
+    throw error;
+  }
+};
+
+// Search saved passwords by name (sem diferenciar maiúsculas e acentos)
+export const searchSavedPasswords = async (query, match = 'substring') => {
+  try {
+    const response = await api.get('/api/passwords', { params: { q: query, match } });
+    return response.data.passwords;
+  } catch (error) {
+    console.error('Error searching saved passwords:', error);
+    throw error;
+  }
+};
+
+// Get the server-side generation history, one page at a time
+export const getGenerationHistory = async (cursor = null, limit = 50) => {
+  try {
+    const params = cursor ? { cursor, limit } : { limit };
+    const response = await api.get('/api/history', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Error getting generation history:', error);
+    throw error;
+  }
+};
+
+// Reveal a single saved password
+export const revealPassword = async (passwordId) => {
+  try {
+    const response = await api.get(`/api/passwords/${passwordId}/reveal`);
+    return response.data.password;
+  } catch (error) {
+    console.error('Error revealing password:', error);
+    throw error;
+  }
+};
+
+// Sync saved passwords incrementally (só o que mudou desde o último cursor)
+export const syncSavedPasswords = async () => {
+  try {
+    let since = await getSyncCursor();
+    let passwords;
+    let hasMore = true;
+    while (hasMore) {
+      const response = await api.get('/api/passwords/changes', { params: { since } });
+      const { changes, deleted, cursor, has_more } = response.data;
+      passwords = await applyPasswordChanges({ changes, deleted, cursor });
+      since = cursor;
+      hasMore = has_more;
+    }
+    return passwords;
+  } catch (error) {
+    console.error('Error syncing saved passwords:', error);
+    throw error;
+  }
+};
+
 // Save a password to the API
 export const savePassword = async (name, password) => {
   try {
@@ -125,4 +226,15 @@ export const deletePassword = async (passwordId) => {
     console.error('Error deleting password:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+}; 
+
+// Apply several operations (create/rename/update/delete) in a single transaction
+export const applyPasswordOperations = async (operations, atomic = true) => {
+  try {
+    const response = await api.post('/api/passwords/batch', { operations, atomic });
+    return response.data;
+  } catch (error) {
+    console.error('Error applying password operations:', error);
+    throw error;
+  }
+};
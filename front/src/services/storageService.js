@@ -2,6 +2,8 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 
 const HISTORY_KEY = '@password_history';
 const SAVED_PASSWORDS_KEY = '@saved_passwords';
+const SYNCED_PASSWORDS_KEY = '@synced_passwords';
+const SYNC_CURSOR_KEY = '@sync_cursor';
 
 // Save a password to history (temporary storage for generated passwords)
 export const saveToHistory = async (password) => {
@@ -135,4 +137,57 @@ export const deleteAllPasswords = async () => {
         console.error('Error deleting all passwords:', error);
         return false;
     }
-}; 
\ No newline at end of file
+};
+
+// Get the local copy of the server vault
+export const getSyncedPasswords = async () => {
+    try {
+        const synced = await AsyncStorage.getItem(SYNCED_PASSWORDS_KEY);
+        return synced ? JSON.parse(synced) : [];
+    } catch (error) {
+        console.error('Error getting synced passwords:', error);
+        return [];
+    }
+};
+
+// Get the last change cursor received from the server
+export const getSyncCursor = async () => {
+    try {
+        const cursor = await AsyncStorage.getItem(SYNC_CURSOR_KEY);
+        // Integer or "seq:id" (interrupted page); sent back as is
+        return cursor || '0';
+    } catch (error) {
+        console.error('Error getting sync cursor:', error);
+        return '0';
+    }
+};
+
+// Merge a page of server changes (upserts + tombstones) into the local copy
+export const applyPasswordChanges = async ({ changes, deleted, cursor }) => {
+    try {
+        const existing = await getSyncedPasswords();
+        const touched = new Set([...changes.map(pwd => pwd.id), ...deleted]);
+        const updated = [...changes, ...existing.filter(pwd => !touched.has(pwd.id))];
+        updated.sort((a, b) => (a.created_at < b.created_at ? 1 : -1));
+
+        await AsyncStorage.multiSet([
+            [SYNCED_PASSWORDS_KEY, JSON.stringify(updated)],
+            [SYNC_CURSOR_KEY, String(cursor)]
+        ]);
+        return updated;
+    } catch (error) {
+        console.error('Error applying password changes:', error);
+        throw error;
+    }
+};
+
+// Forget the local copy (ex.: logout), forcing a full sync next time
+export const clearSyncedPasswords = async () => {
+    try {
+        await AsyncStorage.multiRemove([SYNCED_PASSWORDS_KEY, SYNC_CURSOR_KEY]);
+        return true;
+    } catch (error) {
+        console.error('Error clearing synced passwords:', error);
+        return false;
+    }
+};